@@ -0,0 +1,76 @@
+"""Time-bucketed rollups of marketplace activity for the admin dashboards.
+
+Each metric (revenue, signups, uploads, ...) is added into an hourly and a
+daily bucket as the event is written, so reading a series costs one lookup per
+returned point regardless of how much history the stores hold. Buckets older
+than the retention of their interval are pruned as new ones arrive.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# Interval name -> (bucket width, buckets retained)
+INTERVALS = {
+    "hour": (timedelta(hours=1), 24 * 14),
+    "day": (timedelta(days=1), 366 * 2),
+}
+
+
+def bucket_start(when: datetime, interval: str) -> datetime:
+    if interval == "hour":
+        return when.replace(minute=0, second=0, microsecond=0)
+    return when.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class RollingSeries:
+    """Sums per fixed-width bucket, keeping only the most recent buckets"""
+
+    def __init__(self, interval: str):
+        self.interval = interval
+        self.width, self.retention = INTERVALS[interval]
+        self._buckets: Dict[datetime, float] = {}
+        self._latest: Optional[datetime] = None
+
+    def add(self, when: datetime, amount: float = 1) -> None:
+        start = bucket_start(when, self.interval)
+        if self._latest is not None and start <= self._latest - self.width * self.retention:
+            return  # older than anything retained
+        self._buckets[start] = self._buckets.get(start, 0) + amount
+        if self._latest is None or start > self._latest:
+            self._latest = start
+            if len(self._buckets) > self.retention * 2:
+                cutoff = start - self.width * self.retention
+                for key in [key for key in self._buckets if key <= cutoff]:
+                    del self._buckets[key]
+
+    def points(self, count: int, now: Optional[datetime] = None) -> List[Tuple[datetime, float]]:
+        """The last count buckets up to and including now's, oldest first, zero-filled"""
+        count = max(1, min(count, self.retention))
+        end = bucket_start(now or datetime.now(), self.interval)
+        return [
+            (start, self._buckets.get(start, 0))
+            for start in (end - self.width * offset for offset in range(count - 1, -1, -1))
+        ]
+
+
+class ActivitySeries:
+    """Hourly and daily series for each tracked metric"""
+
+    METRICS = ("revenue", "purchases", "signups", "uploads")
+
+    def __init__(self):
+        self._series = {
+            metric: {interval: RollingSeries(interval) for interval in INTERVALS}
+            for metric in self.METRICS
+        }
+
+    def record(self, metric: str, when: datetime, amount: float = 1) -> None:
+        for series in self._series[metric].values():
+            series.add(when, amount)
+
+    def record_purchase(self, purchase: Dict[str, object]) -> None:
+        self.record("purchases", purchase["created_at"])
+        self.record("revenue", purchase["created_at"], purchase.get("amount", 0))
+
+    def points(self, metric: str, interval: str, count: int,
+               now: Optional[datetime] = None) -> List[Tuple[datetime, float]]:
+        return self._series[metric][interval].points(count, now)
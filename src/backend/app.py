@@ -1,17 +1,56 @@
 
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Request, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import razorpay
+import asyncio
 import os
-from typing import Optional, List, Dict, Any
+import time
+from typing import Optional, List, Dict, Any, Literal
 import uuid
 from datetime import datetime, timedelta
 import json
-from pydantic import BaseModel, EmailStr
+import logging
+from pydantic import BaseModel, EmailStr, ValidationError
 import re
+import base64
+import csv
+import io
+import hashlib
+import hmac
+from urllib.parse import quote, unquote
+from analytics import INTERVALS, ActivitySeries
+from auth import (
+    InvalidToken, SigningKeyMissing, create_access_token, decode_access_token, hash_password, verify_password
+)
+from cache import ResponseCache, normalize_key
+from counters import CounterBuffer
+from database import Changes, Database, IntegrityError, from_row
+from derivatives import DerivativePipeline
+from discounts import DiscountStore
+from ledger import LedgerWriter
+from metrics import MetricsMiddleware, monitor_loop_lag, profiler, registry, stage
+from payments import PaymentGatewayError, create_gateway
+from quota import create_tracker
+from recommendations import RecommendationIndex
+from records import TEMPLATE_STATUSES, CodedField, InternedField, intern_all
+from storage import (
+    FileRangeResponse, FileStorage, RangeNotSatisfiable, UploadNotFound, UploadOffsetMismatch, UploadTooLarge
+)
+from repository import (
+    PENDING_ORDERS_LIMIT, SORT_ORDERS, OrderRepository, PurchaseRepository, ReviewRepository,
+    SubscriptionRepository, TemplateRepository, UserRepository
+)
+from search_index import tokenize
+from snapshot import Snapshot, WriterLock, write_snapshot_forked
+from serialization import CardCache, dumps, encode_page, stream_page
+from trending import TrendingScorer, run_every
 
 app = FastAPI(title="Celora Backend API", version="2.0.0")
+logger = logging.getLogger(__name__)
 
 # Configure CORS
 app.add_middleware(
@@ -22,22 +61,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency and size histograms, served on /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Security
 security = HTTPBearer()
 
-# Razorpay client
+@app.exception_handler(SigningKeyMissing)
+async def signing_key_missing(request: Request, exc: SigningKeyMissing):
+    # Fail closed: no tokens are issued or accepted without a configured JWT_SECRET_KEY
+    return JSONResponse(status_code=503, content={"detail": "Authentication is not configured"})
+
+# Razorpay client (signature verification only; orders go through the async gateway)
 razorpay_client = razorpay.Client(auth=(
     os.getenv("RAZORPAY_KEY_ID", "your_key_id"),
     os.getenv("RAZORPAY_KEY_SECRET", "your_key_secret")
 ))
+# Shared secret of the Razorpay webhook (set in the Razorpay dashboard, separate from the key secret);
+# webhooks are refused until it is configured
+RAZORPAY_WEBHOOK_SECRET = os.getenv("RAZORPAY_WEBHOOK_SECRET")
 
-# Mock databases
-templates_db = []
-users_db = []
-purchases_db = []
-subscriptions_db = []
-reviews_db = []
-discounts_db = []
+# Non-blocking payment gateway (PAYMENT_GATEWAY=fake for local load testing)
+payment_gateway = create_gateway()
+
+@app.on_event("shutdown")
+async def close_payment_gateway():
+    await payment_gateway.close()
+
+# In-memory stores (hydrated from the database at startup when DATABASE_URL is set)
+templates_db = TemplateRepository()
+users_db = UserRepository()
+purchases_db = PurchaseRepository()
+orders_db = OrderRepository(int(os.getenv("PENDING_ORDERS_LIMIT", str(PENDING_ORDERS_LIMIT))))
+subscriptions_db = SubscriptionRepository()
+reviews_db = ReviewRepository()
+discounts_db = DiscountStore()
 admin_settings = {
     "terms_of_service": "Default Terms of Service content...",
     "privacy_policy": "Default Privacy Policy content...",
@@ -51,12 +109,83 @@ admin_settings = {
     }
 }
 
+# Durable storage behind the in-memory stores (enabled by DATABASE_URL)
+database = Database(os.getenv("DATABASE_URL"))
+
+# Content-addressed file storage for template bundles and images (STORAGE_ROOT)
+file_storage = FileStorage()
+
+# Daily download limits (QUOTA_REDIS_URL shares the counters between workers)
+download_quota = create_tracker(os.getenv("QUOTA_REDIS_URL"))
+
+# Resized WebP variants of thumbnails and previews, rendered in the background
+derivative_pipeline = DerivativePipeline(file_storage.root)
+
+@app.on_event("shutdown")
+async def stop_derivative_pipeline():
+    derivative_pipeline.shutdown()
+
+# Serialized /templates responses; writes drop only the entries they affect and
+# the TTL bounds how stale counters and freshly rendered thumbnails can get
+catalog_cache = ResponseCache(
+    max_entries=int(os.getenv("CATALOG_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("CATALOG_CACHE_TTL", "30"))
+)
+
+# Encoded template cards reused until the template changes; pages larger than
+# STREAM_PAGE_SIZE are streamed as chunked JSON instead of built in one piece
+card_cache = CardCache()
+STREAM_PAGE_SIZE = int(os.getenv("STREAM_PAGE_SIZE", "100"))
+
+# Trending and featured flags, recomputed every TRENDING_INTERVAL seconds from decayed activity
+trending_scorer = TrendingScorer(
+    half_life=float(os.getenv("TRENDING_HALF_LIFE", str(3 * 24 * 60 * 60))),
+    top_k=int(os.getenv("TRENDING_TOP_K", "50")),
+    featured_k=int(os.getenv("FEATURED_TOP_K", "12"))
+)
+trending_task: Optional[asyncio.Task] = None
+
+# Precomputed similar-template lists, built at startup and updated on approval and purchase
+recommendations = RecommendationIndex()
+
+# Hourly and daily revenue, purchase, signup and upload series, fed as each is written
+activity = ActivitySeries()
+
+# View and download counters, coalesced per row and written every COUNTER_FLUSH_INTERVAL seconds
+async def write_counters(batch: Dict[Any, Dict[str, int]]):
+    changes = Changes()
+    for (table, key), deltas in batch.items():
+        changes.increment(table, key, **deltas)
+    await database.apply(changes)
+    
+    for (table, key), deltas in batch.items():
+        store = templates_db if table == "templates" else users_db
+        record = store.get(key)
+        if record:
+            store.update(record, **{column: getattr(record, column) + delta for column, delta in deltas.items()})
+
+counter_buffer = CounterBuffer(
+    write_counters,
+    interval=float(os.getenv("COUNTER_FLUSH_INTERVAL", "2")),
+    max_keys=int(os.getenv("COUNTER_FLUSH_ROWS", "10000"))
+)
+counter_task: Optional[asyncio.Task] = None
+
+# Operational gauges exported next to the request histograms
+registry.gauge("catalog_cache_entries", "Cached /templates responses", lambda: len(catalog_cache))
+registry.gauge("catalog_cache_hits", "Catalog response cache hits since start", lambda: catalog_cache.hits)
+registry.gauge("catalog_cache_misses", "Catalog response cache misses since start", lambda: catalog_cache.misses)
+registry.gauge("card_cache_entries", "Encoded template cards", lambda: len(card_cache))
+registry.gauge("templates_total", "Templates in the catalog", lambda: len(templates_db))
+registry.gauge("counter_buffer_pending_rows", "Rows with view/download deltas not yet written", lambda: len(counter_buffer))
+loop_lag_task: Optional[asyncio.Task] = None
+
 # Pydantic Models
 class UserRegistration(BaseModel):
     email: EmailStr
     password: str
     name: str
-    user_type: str  # buyer, seller, undecided
+    user_type: Literal["buyer", "seller", "undecided"]
     mobile: Optional[str] = None
 
 class SellerRegistration(BaseModel):
@@ -84,18 +213,77 @@ class ReviewCreate(BaseModel):
     rating: int  # 1-5
     comment: str
 
+class ReviewImport(BaseModel):
+    template_id: str
+    user_id: str
+    rating: int  # 1-5
+    comment: str
+    created_at: Optional[datetime] = None
+
+class TemplateViews(BaseModel):
+    template_ids: List[str]  # impressions of one catalog page, at most 100
+
 class DiscountCreate(BaseModel):
     percentage: int  # 30-55
     duration_hours: int
     template_ids: Optional[List[str]] = None  # If None, applies to all
 
+class TemplateCard(BaseModel):
+    id: str
+    title: str
+    description: str
+    price: int
+    category: str
+    tags: List[str]
+    thumbnail: Optional[str] = None
+    downloads: int
+    rating: float
+    is_free: bool
+    is_trending: bool
+    estimated_time_saved: int
+    estimated_roi: int
+    created_at: datetime
+
+class TemplateListResponse(BaseModel):
+    total: int
+    page: Optional[int] = None
+    has_more: bool
+    next_cursor: Optional[str] = None
+    templates: List[TemplateCard]
+
+class SellerTemplateCard(BaseModel):
+    id: str
+    title: str
+    downloads: int
+    views: int
+    rating: float
+    status: str
+    sales: int
+    earnings: float
+
+class SellerDashboardResponse(BaseModel):
+    total_earnings: float
+    total_downloads: int
+    total_templates: int
+    total_views: int
+    total_sales: int
+    templates: List[SellerTemplateCard]
+
 # User and Template classes
 class User:
+    __slots__ = (
+        "id", "email", "name", "_user_type", "_plan", "created_at", "is_verified", "mobile",
+        "pan_number", "address", "bank_details", "is_seller_verified", "total_earnings", "total_downloads",
+        "password_hash", "is_admin"
+    )
+    user_type = InternedField()  # buyer, seller, undecided
+    plan = InternedField()
+    
     def __init__(self, id: str, email: str, name: str, user_type: str, **kwargs):
         self.id = id
         self.email = email
         self.name = name
-        self.user_type = user_type  # buyer, seller, undecided
+        self.user_type = user_type
         self.plan = kwargs.get('plan', 'free')
         self.created_at = datetime.now()
         self.is_verified = kwargs.get('is_verified', False)
@@ -107,8 +295,21 @@ class User:
         self.is_seller_verified = kwargs.get('is_seller_verified', False)
         self.total_earnings = 0
         self.total_downloads = 0
+        self.password_hash = kwargs.get('password_hash')
+        # Granted by operators in the database only, never through the API
+        self.is_admin = False
 
 class Template:
+    __slots__ = (
+        "id", "title", "description", "price", "_user_id", "_category", "_tags", "file_url", "thumbnail",
+        "preview_images", "_status", "created_at", "downloads", "views", "sales", "earnings", "rating",
+        "rating_sum", "reviews_count", "is_trending", "is_featured", "is_subscription_eligible", "is_free",
+        "estimated_time_saved", "estimated_roi"
+    )
+    user_id = InternedField()
+    category = InternedField()
+    status = CodedField(TEMPLATE_STATUSES)
+    
     def __init__(self, id: str, title: str, description: str, price: int, 
                  user_id: str, category: str, tags: List[str], **kwargs):
         self.id = id
@@ -121,11 +322,14 @@ class Template:
         self.file_url = kwargs.get('file_url')
         self.thumbnail = kwargs.get('thumbnail')
         self.preview_images = kwargs.get('preview_images', [])
-        self.status = kwargs.get('status', 'pending')  # pending, approved, rejected
+        self.status = kwargs.get('status', 'pending')
         self.created_at = datetime.now()
         self.downloads = 0
         self.views = 0
+        self.sales = 0
+        self.earnings = 0
         self.rating = 0.0
+        self.rating_sum = 0
         self.reviews_count = 0
         self.is_trending = False
         self.is_featured = False
@@ -133,11 +337,271 @@ class Template:
         self.is_free = kwargs.get('is_free', False)
         self.estimated_time_saved = kwargs.get('estimated_time_saved', 4)  # hours
         self.estimated_roi = kwargs.get('estimated_roi', price * 10) if price > 0 else 0
+    
+    @property
+    def tags(self) -> List[str]:
+        return self._tags
+    
+    @tags.setter
+    def tags(self, value: List[str]):
+        self._tags = intern_all(value)
+
+# Startup and shutdown
+def replay_rows(rows: Dict[str, List[dict]], incremental: bool = True):
+    """Upsert database rows into the in-memory stores.
+
+    Rows already in memory are refreshed when they differ and skipped otherwise,
+    so replaying overlapping windows is harmless. With incremental=False (a full
+    load) the recommendation index is left to be built in one pass afterwards.
+    """
+    for row in rows["users"]:
+        user = users_db.get(row["id"])
+        if user is None:
+            users_db.add(from_row(User, row))
+            activity.record("signups", row["created_at"])
+            continue
+        changed = {key: value for key, value in row.items() if getattr(user, key) != value}
+        if changed:
+            users_db.update(user, **changed)
+    for row in rows["templates"]:
+        # Counters are incremented in SQL; derive the average from them
+        row["rating"] = round(row["rating_sum"] / row["reviews_count"], 1) if row["reviews_count"] else 0.0
+        template = templates_db.get(row["id"])
+        if template is None:
+            template = templates_db.add(from_row(Template, row))
+            activity.record("uploads", template.created_at)
+            if incremental and template.status == "approved":
+                recommendations.add(template)
+        else:
+            changed = {key: value for key, value in row.items() if getattr(template, key) != value}
+            if not changed:
+                continue
+            templates_db.update(template, **changed)
+            if incremental and "status" in changed:
+                if template.status == "approved":
+                    recommendations.add(template)
+                else:
+                    recommendations.remove(template.id)
+        catalog_cache.invalidate_template(template)
+    for row in rows["reviews"]:
+        if not reviews_db.get(row["id"]):
+            reviews_db.add(row)
+    if not incremental:
+        # Full load into empty stores: bulk insert, sorting the purchase time index once
+        purchases_db.extend(rows["purchases"])
+        for row in rows["purchases"]:
+            activity.record_purchase(row)
+    else:
+        for row in rows["purchases"]:
+            if purchases_db.get(row["id"]):
+                continue
+            owned = purchases_db.owned_by(row["user_id"])
+            purchases_db.add(row)
+            orders_db.discard(row["order_id"])
+            activity.record_purchase(row)
+            if row["template_id"] not in owned:
+                recommendations.record_purchase(row["template_id"], owned)
+    for row in rows["subscriptions"]:
+        if not subscriptions_db.get(row["id"]):
+            subscriptions_db.add(row)
+            activity.record("revenue", row["created_at"], row["amount"])
+    for row in rows["discounts"]:
+        if not discounts_db.get(row["id"]):
+            discounts_db.add(row)
+
+# Built stores saved to SNAPSHOT_PATH every SNAPSHOT_INTERVAL seconds by one worker.
+# Starting workers restore them and replay only the rows changed since, instead of
+# re-indexing the whole database. Every CHANGE_REPLAY_INTERVAL seconds (10 by
+# default, 0 disables) each worker also picks up the other workers' writes.
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH")
+SNAPSHOT_SECTIONS = ("users", "templates", "purchases", "subscriptions", "reviews", "discounts",
+                     "recommendations", "activity")
+# Replays reach back this far, covering writes committed but not yet applied in
+# memory when the snapshot was taken, and clock skew between workers
+REPLAY_MARGIN = timedelta(seconds=float(os.getenv("CHANGE_REPLAY_MARGIN", "60")))
+snapshot_writer = WriterLock(SNAPSHOT_PATH) if SNAPSHOT_PATH else None
+restored_from_snapshot = False
+last_replay: Optional[datetime] = None
+snapshot_task: Optional[asyncio.Task] = None
+replay_task: Optional[asyncio.Task] = None
+
+def read_snapshot(path: str):
+    with Snapshot(path) as snapshot:
+        return snapshot.taken_at, {name: snapshot.load(name) for name in SNAPSHOT_SECTIONS}
+
+@app.on_event("startup")
+async def load_database():
+    """Connect to the database and hydrate the in-memory stores, from the snapshot when there is one"""
+    global users_db, templates_db, purchases_db, subscriptions_db, reviews_db, discounts_db
+    global recommendations, activity, restored_from_snapshot, last_replay
+    if not database.enabled:
+        return
+    await database.connect()
+    
+    since = None
+    if SNAPSHOT_PATH and os.path.exists(SNAPSHOT_PATH):
+        try:
+            taken_at, stores = await run_in_threadpool(read_snapshot, SNAPSHOT_PATH)
+        except Exception:
+            logger.exception("Ignoring unreadable catalog snapshot %s", SNAPSHOT_PATH)
+        else:
+            users_db, templates_db = stores["users"], stores["templates"]
+            purchases_db, subscriptions_db = stores["purchases"], stores["subscriptions"]
+            reviews_db, discounts_db = stores["reviews"], stores["discounts"]
+            recommendations, activity = stores["recommendations"], stores["activity"]
+            restored_from_snapshot = True
+            since = taken_at - REPLAY_MARGIN
+    
+    started = datetime.now()
+    replay_rows(await database.load_since(since), incremental=restored_from_snapshot)
+    last_replay = started
+
+async def replay_changes():
+    """Apply the rows other workers changed since the last replay"""
+    global last_replay
+    started = datetime.now()
+    replay_rows(await database.load_since(last_replay - REPLAY_MARGIN))
+    last_replay = started
+
+async def write_catalog_snapshot():
+    """Snapshot the stores from a forked child, so this worker keeps serving meanwhile"""
+    stores = {
+        "users": users_db, "templates": templates_db, "purchases": purchases_db,
+        "subscriptions": subscriptions_db, "reviews": reviews_db, "discounts": discounts_db,
+        "recommendations": recommendations, "activity": activity
+    }
+    pid = write_snapshot_forked(SNAPSHOT_PATH, stores, datetime.now())
+    if pid:
+        _, status = await run_in_threadpool(os.waitpid, pid, 0)
+        if status:
+            raise RuntimeError(f"Snapshot writer exited with status {status}")
+
+@app.on_event("startup")
+async def start_counter_flush():
+    global counter_task
+    counter_task = asyncio.create_task(counter_buffer.run())
+
+@app.on_event("shutdown")
+async def flush_counters():
+    """Write the buffered counters before the database connection closes"""
+    if counter_task is not None:
+        counter_task.cancel()
+    await counter_buffer.flush()
+
+@app.on_event("shutdown")
+async def close_database():
+    await database.close()
+
+@app.on_event("startup")
+async def build_recommendations():
+    """Build the recommendation index from the hydrated catalog and purchase history"""
+    global recommendations
+    if restored_from_snapshot:
+        return
+    approved = templates_db.by_status("approved")
+    baskets = [list(basket) for basket in purchases_db.baskets()]
+    recommendations = await run_in_threadpool(RecommendationIndex.build, approved, baskets)
+
+@app.on_event("startup")
+async def start_snapshot_jobs():
+    global snapshot_task, replay_task
+    if not database.enabled:
+        return
+    if snapshot_writer and snapshot_writer.acquire():
+        snapshot_task = asyncio.create_task(
+            run_every(float(os.getenv("SNAPSHOT_INTERVAL", "600")), write_catalog_snapshot)
+        )
+    replay_interval = float(os.getenv("CHANGE_REPLAY_INTERVAL", "10"))
+    if replay_interval > 0:
+        replay_task = asyncio.create_task(run_every(replay_interval, replay_changes))
+
+@app.on_event("shutdown")
+async def stop_snapshot_jobs():
+    for task in (snapshot_task, replay_task):
+        if task is not None:
+            task.cancel()
+    if snapshot_writer:
+        snapshot_writer.release()
+
+async def refresh_trending():
+    """Score the catalog off the event loop and swap in the new trending and featured sets"""
+    columns = templates_db.columns
+    ids = list(columns.ids)
+    snapshot = columns.snapshot()
+    trending, featured = await run_in_threadpool(trending_scorer.score, ids, snapshot, time.time())
+    trending, featured = set(trending), set(featured)
+    
+    flagged = set(columns.ids_where(columns["is_trending"] | columns["is_featured"]))
+    changes = Changes()
+    changed = []
+    for template_id in flagged | trending | featured:
+        template = templates_db.get(template_id)
+        flags = {"is_trending": template_id in trending, "is_featured": template_id in featured}
+        if template.is_trending != flags["is_trending"] or template.is_featured != flags["is_featured"]:
+            changes.update("templates", template_id, **flags)
+            changed.append((template, flags))
+    await database.apply(changes)
+    
+    # No awaits from here on, so readers see either the old sets or the new ones
+    for template, flags in changed:
+        templates_db.update(template, **flags)
+        catalog_cache.invalidate_template(template)
+
+@app.on_event("startup")
+async def start_trending_job():
+    global trending_task
+    trending_task = asyncio.create_task(run_every(float(os.getenv("TRENDING_INTERVAL", "300")), refresh_trending))
+
+@app.on_event("shutdown")
+async def stop_trending_job():
+    if trending_task is not None:
+        trending_task.cancel()
+
+@app.on_event("startup")
+async def start_monitoring():
+    """Measure event loop lag, and profile slow requests when PROFILE_SLOW_REQUEST_MS is set"""
+    global loop_lag_task
+    loop_lag_task = asyncio.create_task(monitor_loop_lag(float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))))
+    if os.getenv("PROFILE_SLOW_REQUEST_MS"):
+        profiler.threshold = float(os.getenv("PROFILE_SLOW_REQUEST_MS")) / 1000
+        profiler.start()
+
+@app.on_event("shutdown")
+async def stop_monitoring():
+    if loop_lag_task is not None:
+        loop_lag_task.cancel()
+    profiler.stop()
 
 # Helper functions
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    # Mock user validation - in production, validate JWT token
-    return {"id": "user123", "email": "user@example.com", "name": "John Doe", "user_type": "seller"}
+async def find_user(user_id: str) -> Optional[User]:
+    """A user from memory, or from the database if registered through another worker since this one loaded"""
+    user = users_db.get(user_id)
+    if user is None:
+        row = await database.fetch("users", id=user_id)
+        user = from_row(User, row) if row else None
+    return user
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Resolve the bearer JWT to the current user; verified claims are cached until the token expires"""
+    try:
+        claims = decode_access_token(credentials.credentials)
+    except InvalidToken:
+        raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+    
+    # Identity and role always come from the stored account, never from the claims
+    user = await find_user(claims["sub"])
+    if user is None:
+        raise HTTPException(status_code=401, detail="Unknown user", headers={"WWW-Authenticate": "Bearer"})
+    return {"id": user.id, "email": user.email, "name": user.name, "user_type": user.user_type}
+
+async def require_admin(current_user: dict = Depends(get_current_user)):
+    """The current user, provided their stored account carries the is_admin flag"""
+    # Read from the database when there is one, so grants and revocations apply at once
+    row = await database.fetch("users", id=current_user["id"])
+    user = from_row(User, row) if row else users_db.get(current_user["id"])
+    if not user or not user.is_admin:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return current_user
 
 def validate_password(password: str) -> bool:
     """Validate password format: uppercase, number, symbol"""
@@ -158,6 +622,158 @@ def validate_ifsc(ifsc: str) -> bool:
     """Validate IFSC code format"""
     return re.match(r'^[A-Z]{4}0[A-Z0-9]{6}$', ifsc) is not None
 
+def validate_rating(rating: int) -> bool:
+    """Validate review rating is between 1 and 5"""
+    return 1 <= rating <= 5
+
+def apply_ratings(template: Template, ratings: List[int]):
+    """Fold new review ratings into a template's running sum, count and average"""
+    rating_sum = template.rating_sum + sum(ratings)
+    reviews_count = template.reviews_count + len(ratings)
+    templates_db.update(
+        template,
+        rating_sum=rating_sum,
+        reviews_count=reviews_count,
+        rating=round(rating_sum / reviews_count, 1) if reviews_count else 0.0
+    )
+
+def encode_cursor(sort: str, position: Dict[str, Any]) -> str:
+    """Encode an opaque pagination cursor bound to a sort order"""
+    payload = json.dumps({"s": sort, **position}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str) -> Dict[str, Any]:
+    """Decode a pagination cursor, rejecting malformed ones or ones from another sort order"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(position, dict) or position.get("s") != sort:
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested sort order")
+    if sort == "search":
+        offset = position.get("o")
+        valid = isinstance(offset, int) and not isinstance(offset, bool) and offset >= 0
+    else:
+        # Listing sort keys are (number, template id), compared against the sort index
+        key = position.get("k")
+        valid = (isinstance(key, list) and len(key) == 2
+                 and isinstance(key[0], (int, float)) and not isinstance(key[0], bool)
+                 and isinstance(key[1], str))
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return position
+
+def storage_url(stored: dict) -> str:
+    """Public URL of a stored object"""
+    return f"/storage/objects/{stored['digest']}/{quote(stored['filename'] or 'file')}"
+
+def can_download(template: Template, current_user: dict, plan: str) -> bool:
+    """Free templates, purchases, eligible templates on paid plans and the seller's own uploads"""
+    return (
+        template.user_id == current_user["id"]
+        or template.is_free
+        or (plan != "free" and template.is_subscription_eligible)
+        or purchases_db.has_purchased(current_user["id"], template.id)
+    )
+
+def thumbnail_url_for(template: Template, width: int) -> Optional[str]:
+    """Best rendered thumbnail variant for a display width, or the original until it is ready"""
+    match = re.match(r'^/storage/objects/([0-9a-f]{64})/', template.thumbnail or "")
+    if not match:
+        return template.thumbnail
+    return derivative_pipeline.variant_url(match.group(1), width) or template.thumbnail
+
+def new_purchase(template: Template, buyer_id: str, amount: int, payment_id: Optional[str] = None,
+                 order_id: Optional[str] = None) -> dict:
+    """Ledger entry for a purchase, crediting the seller at the current commission rate"""
+    commission = float(admin_settings["seller_commission"])
+    return {
+        "id": str(uuid.uuid4()),
+        "template_id": template.id,
+        "user_id": buyer_id,
+        "seller_id": template.user_id,
+        "amount": amount,
+        "seller_commission": commission,
+        "seller_earnings": round(amount * commission, 2),
+        "payment_id": payment_id,
+        "order_id": order_id,
+        "created_at": datetime.now()
+    }
+
+def apply_purchase(purchase: dict):
+    """Fold a written purchase into the in-memory stores and aggregates"""
+    template = templates_db.get(purchase["template_id"])
+    owned = purchases_db.owned_by(purchase["user_id"])
+    purchases_db.add(purchase)
+    orders_db.discard(purchase["order_id"])
+    activity.record_purchase(purchase)
+    if purchase["template_id"] not in owned:
+        recommendations.record_purchase(purchase["template_id"], owned)
+    if template:
+        templates_db.update(template, sales=template.sales + 1, earnings=template.earnings + purchase["seller_earnings"])
+    seller = users_db.get(purchase["seller_id"])
+    if seller:
+        users_db.update(seller, total_earnings=seller.total_earnings + purchase["seller_earnings"])
+
+def apply_subscription(subscription: dict):
+    """Fold a written subscription activation into the in-memory stores and aggregates"""
+    subscriptions_db.add(subscription)
+    activity.record("revenue", subscription["created_at"], subscription["amount"])
+    user = users_db.get(subscription["user_id"])
+    if user:
+        users_db.update(user, plan=subscription["plan"])
+
+async def write_ledger(entries: List[tuple]) -> List[dict]:
+    """Append a batch of ledger entries in one transaction, then apply each exactly once"""
+    changes = Changes()
+    for kind, record in entries:
+        if kind == "purchase":
+            changes.insert("purchases", record)
+            changes.increment("templates", record["template_id"], sales=1, earnings=record["seller_earnings"])
+            changes.increment("users", record["seller_id"], total_earnings=record["seller_earnings"])
+        else:
+            changes.insert("subscriptions", record)
+            changes.update("users", record["user_id"], plan=record["plan"])
+    await database.apply(changes)
+    
+    for kind, record in entries:
+        if kind == "purchase":
+            apply_purchase(record)
+        else:
+            apply_subscription(record)
+    return [record for _, record in entries]
+
+# Captured payments, group-committed and deduplicated by payment id
+payment_ledger = LedgerWriter(write_ledger)
+
+def recorded_payment(payment_id: str) -> Optional[dict]:
+    return purchases_db.get_by_payment_id(payment_id) or subscriptions_db.get_by_payment_id(payment_id)
+
+async def record_purchase(template: Template, buyer_id: str, amount: int, payment_id: Optional[str] = None,
+                          order_id: Optional[str] = None) -> dict:
+    """Record a completed purchase and credit the seller at the current commission rate.
+
+    Concurrent calls for the same payment share one write. Raises IntegrityError
+    if another worker already recorded the payment.
+    """
+    purchase = new_purchase(template, buyer_id, amount, payment_id=payment_id, order_id=order_id)
+    return await payment_ledger.append(payment_id or purchase["id"], ("purchase", purchase))
+
+async def record_subscription(user_id: str, plan: str, amount: int, payment_id: str,
+                              order_id: Optional[str] = None) -> dict:
+    """Record a paid subscription and switch the user to its plan"""
+    subscription = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "plan": plan,
+        "amount": amount,
+        "payment_id": payment_id,
+        "order_id": order_id,
+        "created_at": datetime.now()
+    }
+    return await payment_ledger.append(payment_id, ("subscription", subscription))
+
 # Auth endpoints
 @app.post("/auth/register")
 async def register_user(user_data: UserRegistration):
@@ -170,14 +786,16 @@ async def register_user(user_data: UserRegistration):
         )
     
     # Check if user exists
-    existing_user = next((u for u in users_db if u.email == user_data.email), None)
-    if existing_user:
+    if users_db.get_by_email(user_data.email):
         raise HTTPException(status_code=400, detail="User already exists")
     
     # Validate mobile if provided
     if user_data.mobile and not validate_mobile(user_data.mobile):
         raise HTTPException(status_code=400, detail="Invalid mobile number format")
     
+    if user_data.mobile and users_db.get_by_mobile(user_data.mobile):
+        raise HTTPException(status_code=400, detail="Mobile number already registered")
+    
     # Create new user
     user_id = str(uuid.uuid4())
     new_user = User(
@@ -185,9 +803,17 @@ async def register_user(user_data: UserRegistration):
         email=user_data.email,
         name=user_data.name,
         user_type=user_data.user_type,
-        mobile=user_data.mobile
+        mobile=user_data.mobile,
+        password_hash=await hash_password(user_data.password)
     )
-    users_db.append(new_user)
+    # Issued before storing the account, so a missing signing key leaves nothing behind
+    token = create_access_token(new_user)
+    try:
+        await database.insert("users", new_user)
+    except IntegrityError:
+        raise HTTPException(status_code=400, detail="User already exists")
+    users_db.add(new_user)
+    activity.record("signups", new_user.created_at)
     
     return {
         "success": True,
@@ -197,7 +823,7 @@ async def register_user(user_data: UserRegistration):
             "name": new_user.name,
             "user_type": new_user.user_type
         },
-        "token": f"mock_token_{user_id}"
+        "token": token
     }
 
 @app.post("/auth/register-seller")
@@ -220,10 +846,12 @@ async def register_seller(seller_data: SellerRegistration):
         raise HTTPException(status_code=400, detail="Invalid IFSC code format")
     
     # Check if user exists
-    existing_user = next((u for u in users_db if u.email == seller_data.email), None)
-    if existing_user:
+    if users_db.get_by_email(seller_data.email):
         raise HTTPException(status_code=400, detail="User already exists")
     
+    if users_db.get_by_mobile(seller_data.mobile):
+        raise HTTPException(status_code=400, detail="Mobile number already registered")
+    
     # Create seller user
     user_id = str(uuid.uuid4())
     bank_details = {
@@ -240,9 +868,17 @@ async def register_seller(seller_data: SellerRegistration):
         mobile=seller_data.mobile,
         pan_number=seller_data.pan_number,
         address=seller_data.address,
-        bank_details=bank_details
+        bank_details=bank_details,
+        password_hash=await hash_password(seller_data.password)
     )
-    users_db.append(new_seller)
+    # Issued before storing the account, so a missing signing key leaves nothing behind
+    token = create_access_token(new_seller)
+    try:
+        await database.insert("users", new_seller)
+    except IntegrityError:
+        raise HTTPException(status_code=400, detail="User already exists")
+    users_db.add(new_seller)
+    activity.record("signups", new_seller.created_at)
     
     return {
         "success": True,
@@ -253,25 +889,22 @@ async def register_seller(seller_data: SellerRegistration):
             "name": new_seller.name,
             "user_type": new_seller.user_type
         },
-        "token": f"mock_token_{user_id}"
+        "token": token
     }
 
 @app.post("/auth/login")
 async def login(email_or_mobile: str = Form(...), password: str = Form(...)):
     """Login with email or mobile"""
-    # Find user by email or mobile
-    user = None
-    for u in users_db:
-        if u.email == email_or_mobile or u.mobile == email_or_mobile:
-            user = u
-            break
-    
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid credentials")
+    # Find user by email or mobile; unknown users still pay for a hash check
+    user = users_db.get_by_login(email_or_mobile)
+    if user is None:
+        # Registered through another worker since this one loaded
+        row = (await database.fetch("users", email=email_or_mobile)
+               or await database.fetch("users", mobile=email_or_mobile))
+        user = from_row(User, row) if row else None
     
-    # In production, verify password hash
-    if not validate_password(password):
-        raise HTTPException(status_code=401, detail="Invalid password format")
+    if not await verify_password(password, user.password_hash if user else None):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
     
     return {
         "success": True,
@@ -282,22 +915,37 @@ async def login(email_or_mobile: str = Form(...), password: str = Form(...)):
             "user_type": user.user_type,
             "plan": user.plan
         },
-        "token": f"mock_token_{user.id}"
+        "token": create_access_token(user)
     }
 
 # Template endpoints
 @app.post("/templates/upload")
 async def upload_template(
-    template_data: TemplateUpload,
-    template_file: UploadFile = File(...),
+    template_data: str = Form(...),
+    template_file: Optional[UploadFile] = File(None),
     thumbnail: UploadFile = File(...),
     preview_images: List[UploadFile] = File([]),
+    template_upload_id: Optional[str] = Form(None),
     current_user: dict = Depends(get_current_user)
 ):
-    """Upload a new template"""
+    """Upload a new template.
+
+    The metadata is a TemplateUpload JSON document in the template_data form
+    field. The bundle is either sent inline as template_file or, for large
+    bundles, uploaded beforehand through /uploads and referenced by
+    template_upload_id.
+    """
     if current_user["user_type"] != "seller":
         raise HTTPException(status_code=403, detail="Only sellers can upload templates")
     
+    # A body model can't be mixed with multipart files, so the metadata arrives as a JSON string
+    try:
+        template_data = TemplateUpload.model_validate_json(template_data)
+    except ValidationError as e:
+        raise RequestValidationError([
+            {**error, "loc": ("body", "template_data", *error["loc"])} for error in e.errors(include_url=False)
+        ])
+    
     # Validate minimum price
     if template_data.price > 0 and template_data.price < admin_settings["minimum_template_price"]:
         raise HTTPException(
@@ -305,10 +953,34 @@ async def upload_template(
             detail=f"Minimum template price is ₹{admin_settings['minimum_template_price']}"
         )
     
+    if (template_file is None) == (template_upload_id is None):
+        raise HTTPException(status_code=400, detail="Provide either template_file or template_upload_id")
+    
+    # Stream files into storage chunk by chunk
+    try:
+        if template_upload_id:
+            if file_storage.session_status(template_upload_id)["owner_id"] != current_user["id"]:
+                raise HTTPException(status_code=404, detail="Upload not found")
+            stored_file = await file_storage.complete_session(template_upload_id)
+        else:
+            stored_file = await file_storage.save_upload(template_file)
+        stored_thumbnail = await file_storage.save_upload(thumbnail)
+        stored_previews = [await file_storage.save_upload(img) for img in preview_images]
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except UploadOffsetMismatch:
+        raise HTTPException(status_code=409, detail="Upload is incomplete")
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    # Render resized variants of the images in the background
+    for image in [stored_thumbnail, *stored_previews]:
+        derivative_pipeline.submit(image["digest"], file_storage.object_path(image["digest"]))
+    
     template_id = str(uuid.uuid4())
-    file_url = f"/storage/templates/{template_id}/{template_file.filename}"
-    thumbnail_url = f"/storage/thumbnails/{template_id}/{thumbnail.filename}"
-    preview_urls = [f"/storage/previews/{template_id}/{img.filename}" for img in preview_images]
+    file_url = storage_url(stored_file)
+    thumbnail_url = storage_url(stored_thumbnail)
+    preview_urls = [storage_url(img) for img in stored_previews]
     
     new_template = Template(
         id=template_id,
@@ -325,7 +997,10 @@ async def upload_template(
         is_free=template_data.is_free
     )
     
-    templates_db.append(new_template)
+    await database.insert("templates", new_template)
+    templates_db.add(new_template)
+    activity.record("uploads", new_template.created_at)
+    catalog_cache.invalidate_template(new_template)
     
     return {
         "success": True,
@@ -336,85 +1011,314 @@ async def upload_template(
         }
     }
 
-@app.get("/templates")
+# Storage endpoints
+@app.post("/uploads")
+async def create_upload(
+    filename: str = Form(...),
+    size: Optional[int] = Form(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """Start a resumable upload session for a large template bundle"""
+    try:
+        return file_storage.create_session(filename, size=size, owner_id=current_user["id"])
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+@app.get("/uploads/{upload_id}")
+async def get_upload(upload_id: str, current_user: dict = Depends(get_current_user)):
+    """Report how many bytes of an upload session have been received, to resume from there"""
+    try:
+        status = file_storage.session_status(upload_id)
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if status["owner_id"] != current_user["id"]:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return status
+
+@app.put("/uploads/{upload_id}")
+async def append_upload(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """Append the request body to an upload session at Upload-Offset"""
+    try:
+        if file_storage.session_status(upload_id)["owner_id"] != current_user["id"]:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        offset = await file_storage.append_chunk(upload_id, upload_offset, request.stream())
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except UploadOffsetMismatch as e:
+        raise HTTPException(status_code=409, detail=f"Upload offset mismatch, resume from {e.expected}")
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return {"upload_id": upload_id, "offset": offset}
+
+@app.get("/storage/objects/{digest}")
+@app.get("/storage/objects/{digest}/{filename}")
+async def download_object(digest: str, filename: Optional[str] = None, range: Optional[str] = Header(None)):
+    """Serve a stored thumbnail or preview image, honouring byte ranges.
+
+    Template bundles share the object store but are only served through
+    /templates/{id}/download, which checks entitlement and quota.
+    """
+    media_type = file_storage.image_type(digest)
+    if not media_type:
+        raise HTTPException(status_code=404, detail="File not found")
+    try:
+        return FileRangeResponse(file_storage.object_path(digest), range_header=range, filename=filename,
+                                 media_type=media_type, etag=digest)
+    except RangeNotSatisfiable as e:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                            headers={"Content-Range": str(e)})
+
+@app.get("/templates/{template_id}/download")
+async def download_template(
+    template_id: str,
+    range: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """Download a template bundle, enforcing the plan's daily download limit"""
+    template = templates_db.get(template_id)
+    if not template or (template.status != "approved" and template.user_id != current_user["id"]):
+        raise HTTPException(status_code=404, detail="Template not found")
+    
+    # Signups, upgrades and purchases made through another worker may not have been
+    # replayed here yet; the database is authoritative for what memory lacks
+    user = await find_user(current_user["id"])
+    plan = user.plan if user else "free"
+    if not can_download(template, current_user, plan) and not await database.fetch(
+            "purchases", user_id=current_user["id"], template_id=template.id):
+        raise HTTPException(status_code=403, detail="Purchase this template or upgrade your plan to download it")
+    
+    match = re.match(r'^/storage/objects/([0-9a-f]{64})/([^/]+)$', template.file_url or "")
+    path = file_storage.object_path(match.group(1)) if match else None
+    if not path:
+        raise HTTPException(status_code=404, detail="Template file not found")
+    
+    # Validate the range before charging the quota, so a 416 costs nothing.
+    # Bundles are per-user responses: never cached by shared caches, and the ETag
+    # is not the object digest, which would name the unauthenticated storage URL.
+    try:
+        response = FileRangeResponse(
+            path, range_header=range, filename=unquote(match.group(2)),
+            etag=hashlib.sha256(f"{template.id}:{match.group(1)}".encode()).hexdigest()[:32],
+            cache_control="private, no-store"
+        )
+    except RangeNotSatisfiable as e:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                            headers={"Content-Range": str(e)})
+    
+    # Resumed transfers (ranges not starting at byte 0) don't count as new downloads;
+    # decided from the parsed range, so suffix ranges covering the whole file count too
+    is_new_download = response.start == 0
+    if is_new_download:
+        limits = admin_settings["daily_download_limits"]
+        quota = await download_quota.consume(current_user["id"], int(limits.get(plan, limits["free"])))
+        if not quota.allowed:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Daily download limit of {quota.limit} reached for the {plan} plan",
+                headers={"Retry-After": str(quota.retry_after), "X-RateLimit-Limit": str(quota.limit),
+                         "X-RateLimit-Remaining": "0"}
+            )
+        counter_buffer.add("templates", template.id, downloads=1)
+        counter_buffer.add("users", template.user_id, total_downloads=1)
+    
+    if is_new_download:
+        response.headers["X-RateLimit-Limit"] = str(quota.limit)
+        response.headers["X-RateLimit-Remaining"] = str(quota.remaining)
+    return response
+
+@app.get("/storage/derivatives/{digest}/{width}.webp")
+async def download_derivative(digest: str, width: int, range: Optional[str] = Header(None)):
+    """Serve a resized image variant"""
+    path = derivative_pipeline.path_for(digest, width)
+    if not path:
+        raise HTTPException(status_code=404, detail="File not found")
+    try:
+        return FileRangeResponse(path, range_header=range, media_type="image/webp", etag=f"{digest}-{width}")
+    except RangeNotSatisfiable as e:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                            headers={"Content-Range": str(e)})
+
+@app.get("/templates", response_model=TemplateListResponse)
 async def get_templates(
     category: Optional[str] = None,
     is_free: Optional[bool] = None,
     is_trending: Optional[bool] = None,
     search: Optional[str] = None,
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
+    thumbnail_width: int = 640,
     limit: int = 20,
-    offset: int = 0
+    offset: int = 0,
+    if_none_match: Optional[str] = Header(None)
 ):
-    """Get templates with filtering"""
-    filtered_templates = [t for t in templates_db if t.status == "approved"]
+    """Get templates with filtering and cursor pagination"""
+    if sort is not None and sort not in SORT_ORDERS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(SORT_ORDERS)}")
+    limit = max(limit, 1)
+    facets = templates_db.listing_facets(category, is_free, is_trending)
+    if search is not None:
+        search = " ".join(tokenize(search)) or search
     
-    if category:
-        filtered_templates = [t for t in filtered_templates if t.category.lower() == category.lower()]
-    
-    if is_free is not None:
-        filtered_templates = [t for t in filtered_templates if t.is_free == is_free]
+    key = normalize_key({
+        "facets": sorted(facets),
+        "search": search or None,
+        "sort": sort or (None if search else "created_at"),
+        "cursor": cursor,
+        "offset": None if cursor else offset,
+        "limit": limit,
+        "thumbnail_width": thumbnail_width
+    })
+    if limit > STREAM_PAGE_SIZE:
+        with stage("catalog_filter"):
+            fields, paginated = list_templates(facets, search, sort, cursor, limit, offset)
+        return StreamingResponse(
+            stream_page(fields, "templates", paginated, lambda t: listing_card(t, thumbnail_width)),
+            media_type="application/json",
+            headers={"X-Cache": "BYPASS"}
+        )
     
-    if is_trending:
-        filtered_templates = [t for t in filtered_templates if t.is_trending]
+    entry = catalog_cache.get(key)
+    cache_status = "HIT"
+    if entry is None:
+        cache_status = "MISS"
+        with stage("catalog_filter"):
+            fields, paginated = list_templates(facets, search, sort, cursor, limit, offset)
+        with stage("catalog_serialize"):
+            body = encode_page(fields, "templates", [listing_card(t, thumbnail_width) for t in paginated])
+        entry = catalog_cache.put(key, body, [t.id for t in paginated], listing_predicate(facets, search))
     
+    headers = {"ETag": f'"{entry.etag}"', "X-Cache": cache_status}
+    if if_none_match and entry.etag in if_none_match:
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+def list_templates(facets, search: Optional[str], sort: Optional[str], cursor: Optional[str],
+                   limit: int, offset: int):
+    """Select a /templates page; returns its metadata fields and the templates on it"""
     if search:
-        search_lower = search.lower()
-        filtered_templates = [
-            t for t in filtered_templates 
-            if search_lower in t.title.lower() or 
-               search_lower in t.description.lower() or
-               any(search_lower in tag.lower() for tag in t.tags)
-        ]
+        # Ranked by relevance unless a sort order is requested; only the matching postings are visited
+        matches = [t for t in templates_db.search(search) if templates_db.in_listing(t, facets)]
+        if sort:
+            matches.sort(key=lambda t: templates_db.sort_key(t, sort))
+        start = decode_cursor(cursor, "search")["o"] if cursor else offset
+        paginated = matches[start:start + limit]
+        total = len(matches)
+        next_cursor = encode_cursor("search", {"o": start + limit}) if start + limit < total else None
+    else:
+        sort = sort or "created_at"
+        after = tuple(decode_cursor(cursor, sort)["k"]) if cursor else None
+        paginated, next_key = templates_db.list_page(facets, sort, after=after, offset=offset, limit=limit)
+        total = templates_db.count_listing(facets)
+        next_cursor = encode_cursor(sort, {"k": list(next_key)}) if next_key else None
     
-    # Apply pagination
-    paginated = filtered_templates[offset:offset + limit]
+    return {
+        "total": total,
+        "page": None if cursor else offset // limit + 1,
+        "has_more": next_cursor is not None,
+        "next_cursor": next_cursor
+    }, paginated
+
+def listing_card(t: Template, thumbnail_width: int) -> bytes:
+    """Encoded /templates card, re-rendered only when the template or its thumbnail changes"""
+    thumbnail = thumbnail_url_for(t, thumbnail_width)
+    return card_cache.get("listing", t.id, templates_db.version(t.id), lambda: {
+        "id": t.id,
+        "title": t.title,
+        "description": t.description,
+        "price": t.price,
+        "category": t.category,
+        "tags": t.tags,
+        "thumbnail": thumbnail,
+        "downloads": t.downloads,
+        "rating": t.rating,
+        "is_free": t.is_free,
+        "is_trending": t.is_trending,
+        "estimated_time_saved": t.estimated_time_saved,
+        "estimated_roi": t.estimated_roi,
+        "created_at": t.created_at
+    }, variant=thumbnail)
+
+def dashboard_card(t: Template) -> bytes:
+    return card_cache.get("dashboard", t.id, templates_db.version(t.id), lambda: {
+        "id": t.id,
+        "title": t.title,
+        "downloads": t.downloads,
+        "views": t.views,
+        "rating": t.rating,
+        "status": t.status,
+        "sales": t.sales,
+        "earnings": t.earnings
+    })
+
+def listing_predicate(facets, search: Optional[str]):
+    """Whether a template belongs in a listing; a change to such a template can alter its total or order"""
+    def qualifies(template) -> bool:
+        if not templates_db.in_listing(template, facets):
+            return False
+        return not search or templates_db.search_index.matches(template.id, search)
+    return qualifies
+
+@app.post("/templates/views", status_code=202)
+async def record_template_views(views: TemplateViews):
+    """Count catalog impressions; totals are written in batches and visible after the next flush"""
+    if len(views.template_ids) > 100:
+        raise HTTPException(status_code=400, detail="At most 100 template ids per request")
+    recorded = 0
+    for template_id in views.template_ids:
+        if templates_db.get(template_id):
+            counter_buffer.add("templates", template_id, views=1)
+            recorded += 1
+    return {"recorded": recorded}
+
+@app.post("/templates/{template_id}/view", status_code=202)
+async def record_template_view(template_id: str):
+    """Count one view of a template's page"""
+    if not templates_db.get(template_id):
+        raise HTTPException(status_code=404, detail="Template not found")
+    counter_buffer.add("templates", template_id, views=1)
+    return {"recorded": 1}
+
+@app.get("/templates/{template_id}/recommendations")
+async def get_template_recommendations(template_id: str, limit: int = 8, thumbnail_width: int = 320):
+    """Templates most similar to this one, read from the precomputed neighbor lists"""
+    if not templates_db.get(template_id):
+        raise HTTPException(status_code=404, detail="Template not found")
     
+    neighbors = recommendations.neighbors(template_id, limit=min(max(limit, 1), recommendations.top_n))
     return {
-        "templates": [
+        "template_id": template_id,
+        "recommendations": [
             {
                 "id": t.id,
                 "title": t.title,
-                "description": t.description,
                 "price": t.price,
                 "category": t.category,
-                "tags": t.tags,
-                "thumbnail": t.thumbnail,
-                "downloads": t.downloads,
+                "thumbnail": thumbnail_url_for(t, thumbnail_width),
                 "rating": t.rating,
                 "is_free": t.is_free,
-                "is_trending": t.is_trending,
-                "estimated_time_saved": t.estimated_time_saved,
-                "estimated_roi": t.estimated_roi,
-                "created_at": t.created_at.isoformat()
+                "score": round(score, 4)
             }
-            for t in paginated
-        ],
-        "total": len(filtered_templates),
-        "page": offset // limit + 1,
-        "has_more": offset + limit < len(filtered_templates)
+            for t, score in ((templates_db.get(other), score) for other, score in neighbors)
+        ]
     }
 
 # Payment endpoints
-@app.post("/payment/create-order")
-async def create_payment_order(
-    template_id: str = Form(...),
-    current_user: dict = Depends(get_current_user)
-):
-    """Create Razorpay order for template purchase"""
-    template = next((t for t in templates_db if t.id == template_id), None)
+def prepare_template_order(template_id: str, current_user: dict):
+    """Resolve price and discount for a template purchase and build its order payload"""
+    template = templates_db.get(template_id)
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
     
     if template.is_free:
         raise HTTPException(status_code=400, detail="Cannot purchase free template")
     
-    # Check for active discounts
-    active_discount = None
-    for discount in discounts_db:
-        if (not discount.get("template_ids") or template_id in discount["template_ids"]) and \
-           discount["expires_at"] > datetime.now():
-            active_discount = discount
-            break
+    # Best active discount for this template
+    active_discount = discounts_db.best_for(template_id)
     
     final_price = template.price
     if active_discount:
@@ -431,42 +1335,184 @@ async def create_payment_order(
             "final_price": final_price
         }
     }
+    return template, order_data, final_price, active_discount
+
+def template_order_response(order: dict, template: Template, final_price: int,
+                            active_discount: Optional[dict], current_user: dict) -> dict:
+    """Remember a created order for verification and describe it to the client"""
+    orders_db.add({
+        "id": order["id"],
+        "template_id": template.id,
+        "user_id": current_user["id"],
+        "amount": final_price
+    })
+    return {
+        "order_id": order["id"],
+        "amount": order["amount"],
+        "currency": order["currency"],
+        "template": {
+            "id": template.id,
+            "title": template.title,
+            "price": final_price,
+            "original_price": template.price if active_discount else None,
+            "discount": active_discount["percentage"] if active_discount else None
+        }
+    }
+
+@app.post("/payment/create-order")
+async def create_payment_order(
+    template_id: str = Form(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """Create Razorpay order for template purchase"""
+    template, order_data, final_price, active_discount = prepare_template_order(template_id, current_user)
     
     try:
-        order = razorpay_client.order.create(data=order_data)
-        return {
-            "order_id": order["id"],
-            "amount": order["amount"],
-            "currency": order["currency"],
-            "template": {
-                "id": template.id,
-                "title": template.title,
-                "price": final_price,
-                "original_price": template.price if active_discount else None,
-                "discount": active_discount["percentage"] if active_discount else None
-            }
-        }
-    except Exception as e:
+        with stage("gateway_create_order"):
+            order = await payment_gateway.create_order(order_data)
+    except PaymentGatewayError as e:
         raise HTTPException(status_code=500, detail=f"Failed to create order: {str(e)}")
+    
+    response = template_order_response(order, template, final_price, active_discount, current_user)
+    await database.insert("orders", orders_db.get(order["id"]))
+    return response
+
+@app.post("/payment/create-orders")
+async def create_payment_orders(
+    template_ids: List[str] = Form(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """Create Razorpay orders for every template in a cart concurrently"""
+    template_ids = list(dict.fromkeys(template_ids))
+    prepared = [prepare_template_order(template_id, current_user) for template_id in template_ids]
+    
+    with stage("gateway_create_orders"):
+        results = await payment_gateway.create_orders([order_data for _, order_data, _, _ in prepared])
+    
+    orders = []
+    failed = []
+    for (template, _, final_price, active_discount), result in zip(prepared, results):
+        if isinstance(result, Exception):
+            failed.append({"template_id": template.id, "error": f"Failed to create order: {str(result)}"})
+        else:
+            orders.append(template_order_response(result, template, final_price, active_discount, current_user))
+    
+    await database.insert("orders", *(orders_db.get(order["order_id"]) for order in orders))
+    
+    return {
+        "success": not failed,
+        "orders": orders,
+        "failed": failed,
+        "total_amount": sum(order["amount"] for order in orders)
+    }
+
+@app.post("/payment/verify")
+async def verify_payment(
+    razorpay_order_id: str = Form(...),
+    razorpay_payment_id: str = Form(...),
+    razorpay_signature: str = Form(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """Verify a completed checkout and record the purchase"""
+    order = orders_db.get(razorpay_order_id) or await database.fetch("orders", id=razorpay_order_id)
+    if not order or order["user_id"] != current_user["id"]:
+        raise HTTPException(status_code=404, detail="Order not found")
+    
+    try:
+        razorpay_client.utility.verify_payment_signature({
+            "razorpay_order_id": razorpay_order_id,
+            "razorpay_payment_id": razorpay_payment_id,
+            "razorpay_signature": razorpay_signature
+        })
+    except razorpay.errors.SignatureVerificationError:
+        raise HTTPException(status_code=400, detail="Invalid payment signature")
+    
+    purchase = purchases_db.get_by_payment_id(razorpay_payment_id)
+    if not purchase:
+        template = templates_db.get(order["template_id"])
+        if not template:
+            raise HTTPException(status_code=404, detail="Template not found")
+        try:
+            purchase = await record_purchase(
+                template, current_user["id"], order["amount"],
+                payment_id=razorpay_payment_id, order_id=razorpay_order_id
+            )
+        except IntegrityError:
+            # Recorded concurrently by another worker
+            purchase = await database.fetch("purchases", payment_id=razorpay_payment_id)
+    
+    return {"success": True, "purchase_id": purchase["id"], "template_id": purchase["template_id"]}
+
+@app.post("/payment/webhook")
+async def razorpay_webhook(request: Request, x_razorpay_signature: Optional[str] = Header(None)):
+    """Record captured payments reported by Razorpay; redelivered events are acknowledged once recorded"""
+    if not RAZORPAY_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Webhook secret is not configured")
+    body = await request.body()
+    expected = hmac.new(RAZORPAY_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    if not x_razorpay_signature or not hmac.compare_digest(expected, x_razorpay_signature):
+        raise HTTPException(status_code=400, detail="Invalid webhook signature")
+    try:
+        event = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
+    
+    if event.get("event") not in ("payment.captured", "order.paid"):
+        return {"status": "ignored"}
+    payload = event.get("payload") or {}
+    payment = (payload.get("payment") or {}).get("entity") or {}
+    order = (payload.get("order") or {}).get("entity") or {}
+    payment_id = payment.get("id")
+    if not payment_id:
+        raise HTTPException(status_code=400, detail="Webhook payload has no payment")
+    if recorded_payment(payment_id):
+        return {"status": "duplicate"}
+    
+    # Razorpay sends empty notes as a list
+    notes = {}
+    for source in (order.get("notes"), payment.get("notes")):
+        if isinstance(source, dict):
+            notes = {**source, **notes}
+    order_id = payment.get("order_id") or order.get("id")
+    amount = int(payment.get("amount", 0)) // 100  # paise
+    
+    try:
+        if notes.get("type") == "subscription":
+            if notes.get("plan_id") not in PLAN_PRICES or not notes.get("user_id"):
+                return {"status": "ignored"}
+            record = await record_subscription(notes["user_id"], notes["plan_id"], amount, payment_id, order_id)
+        else:
+            stored_order = orders_db.get(order_id) or (await database.fetch("orders", id=order_id) if order_id else None)
+            template_id = notes.get("template_id") or (stored_order or {}).get("template_id")
+            buyer_id = notes.get("user_id") or (stored_order or {}).get("user_id")
+            template = templates_db.get(template_id) if template_id else None
+            if not template or not buyer_id:
+                return {"status": "ignored"}
+            record = await record_purchase(template, buyer_id, amount, payment_id=payment_id, order_id=order_id)
+    except IntegrityError:
+        # Recorded by another worker
+        return {"status": "duplicate"}
+    
+    return {"status": "recorded", "id": record["id"]}
 
 # Subscription endpoints
+PLAN_PRICES = {
+    "starter": 1249,
+    "pro": 2499,
+    "enterprise": 5999
+}
+
 @app.post("/subscription/create")
 async def create_subscription(
     plan_id: str = Form(...),
     current_user: dict = Depends(get_current_user)
 ):
     """Create subscription for user"""
-    plan_prices = {
-        "starter": 1249,
-        "pro": 2499,
-        "enterprise": 5999
-    }
-    
-    if plan_id not in plan_prices:
+    if plan_id not in PLAN_PRICES:
         raise HTTPException(status_code=400, detail="Invalid plan")
     
     order_data = {
-        "amount": plan_prices[plan_id] * 100,
+        "amount": PLAN_PRICES[plan_id] * 100,
         "currency": "INR",
         "receipt": f"subscription_{plan_id}_{current_user['id']}",
         "notes": {
@@ -477,19 +1523,21 @@ async def create_subscription(
     }
     
     try:
-        order = razorpay_client.order.create(data=order_data)
-        return {
-            "order_id": order["id"],
-            "amount": order["amount"],
-            "currency": order["currency"],
-            "plan": plan_id
-        }
-    except Exception as e:
+        with stage("gateway_create_order"):
+            order = await payment_gateway.create_order(order_data)
+    except PaymentGatewayError as e:
         raise HTTPException(status_code=500, detail=f"Failed to create subscription: {str(e)}")
+    
+    return {
+        "order_id": order["id"],
+        "amount": order["amount"],
+        "currency": order["currency"],
+        "plan": plan_id
+    }
 
 # Admin endpoints (backend only - no UI)
 @app.post("/admin/discount/create")
-async def create_discount(discount_data: DiscountCreate):
+async def create_discount(discount_data: DiscountCreate, current_user: dict = Depends(require_admin)):
     """Create promotional discount"""
     discount_id = str(uuid.uuid4())
     expires_at = datetime.now() + timedelta(hours=discount_data.duration_hours)
@@ -502,7 +1550,15 @@ async def create_discount(discount_data: DiscountCreate):
         "created_at": datetime.now()
     }
     
-    discounts_db.append(discount)
+    await database.insert("discounts", discount)
+    discounts_db.add(discount)
+    if discount_data.template_ids:
+        for template_id in discount_data.template_ids:
+            template = templates_db.get(template_id)
+            if template:
+                catalog_cache.invalidate_template(template)
+    else:
+        catalog_cache.clear()
     
     return {
         "success": True,
@@ -514,24 +1570,220 @@ async def create_discount(discount_data: DiscountCreate):
     }
 
 @app.get("/admin/analytics")
-async def get_admin_analytics():
-    """Get admin analytics"""
-    total_users = len(users_db)
-    total_templates = len(templates_db)
-    total_sellers = len([u for u in users_db if u.user_type == "seller"])
-    total_revenue = sum(p.get("amount", 0) for p in purchases_db)
+async def get_admin_analytics(current_user: dict = Depends(require_admin)):
+    """Get admin analytics from counters maintained on every write"""
+    return {
+        "total_users": len(users_db),
+        "total_templates": len(templates_db),
+        "total_sellers": users_db.count_by_type("seller"),
+        "total_revenue": purchases_db.total_revenue + subscriptions_db.total_revenue,
+        "pending_templates": templates_db.count_by_status("pending"),
+        "active_discounts": discounts_db.active_count()
+    }
+
+@app.get("/admin/analytics/series")
+async def get_admin_analytics_series(metric: str = "revenue", interval: str = "day", points: int = 30, current_user: dict = Depends(require_admin)):
+    """Bucketed totals of one metric, oldest first, including the current bucket"""
+    if metric not in ActivitySeries.METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of: {', '.join(ActivitySeries.METRICS)}")
+    if interval not in INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of: {', '.join(INTERVALS)}")
     
     return {
-        "total_users": total_users,
-        "total_templates": total_templates,
-        "total_sellers": total_sellers,
-        "total_revenue": total_revenue,
-        "pending_templates": len([t for t in templates_db if t.status == "pending"]),
-        "active_discounts": len([d for d in discounts_db if d["expires_at"] > datetime.now()])
+        "metric": metric,
+        "interval": interval,
+        "points": [
+            {"start": start.isoformat(), "value": value}
+            for start, value in activity.points(metric, interval, points)
+        ]
+    }
+
+@app.put("/admin/templates/{template_id}/status")
+async def update_template_status(template_id: str, status: str, current_user: dict = Depends(require_admin)):
+    """Approve or reject an uploaded template"""
+    if status not in TEMPLATE_STATUSES:
+        raise HTTPException(status_code=400, detail="Invalid template status")
+    
+    template = templates_db.get(template_id)
+    if not template:
+        raise HTTPException(status_code=404, detail="Template not found")
+    
+    await database.update("templates", template_id, status=status)
+    templates_db.update(template, status=status)
+    catalog_cache.invalidate_template(template)
+    if status == "approved":
+        recommendations.add(template)
+    else:
+        recommendations.remove(template.id)
+    
+    return {"success": True, "template": {"id": template.id, "status": template.status}}
+
+@app.get("/admin/cache/stats")
+async def get_cache_stats(current_user: dict = Depends(require_admin)):
+    """Hit, miss and invalidation counters of the catalog response cache"""
+    return catalog_cache.stats()
+
+@app.get("/admin/counters/stats")
+async def get_counter_stats(current_user: dict = Depends(require_admin)):
+    """Pending rows and flush totals of the view/download counter buffer"""
+    return counter_buffer.stats()
+
+@app.post("/admin/counters/flush")
+async def flush_counters_now(current_user: dict = Depends(require_admin)):
+    """Write the buffered view and download counts immediately"""
+    return {"success": True, "rows_written": await counter_buffer.flush()}
+
+@app.get("/admin/ledger/stats")
+async def get_ledger_stats(current_user: dict = Depends(require_admin)):
+    """Batching counters of the payment ledger writer"""
+    return payment_ledger.stats()
+
+# Purchase and payout exports, streamed in batches from the purchase time index
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+EXPORT_BATCH_SIZE = 500
+EXPORT_COLUMNS = [
+    "record_type", "seller_id", "seller_name", "seller_email", "purchase_id", "template_id", "buyer_id",
+    "payment_id", "order_id", "created_at", "amount", "seller_commission", "seller_earnings", "purchases",
+    "bank_details"
+]
+
+def export_encoder(format: str):
+    """Encode a list of export rows as NDJSON lines or CSV records"""
+    if format == "ndjson":
+        return lambda rows: b"".join(dumps(row) + b"\n" for row in rows)
+    
+    def encode_csv(rows: List[dict]) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, EXPORT_COLUMNS, extrasaction="ignore")
+        for row in rows:
+            if row.get("bank_details") is not None:
+                row = {**row, "bank_details": json.dumps(row["bank_details"])}
+            writer.writerow(row)
+        return buffer.getvalue().encode()
+    return encode_csv
+
+def purchase_export_row(purchase: dict, seller: Optional[User]) -> dict:
+    return {
+        "record_type": "purchase",
+        "seller_id": purchase["seller_id"],
+        "seller_name": seller.name if seller else None,
+        "seller_email": seller.email if seller else None,
+        "purchase_id": purchase["id"],
+        "template_id": purchase["template_id"],
+        "buyer_id": purchase["user_id"],
+        "payment_id": purchase.get("payment_id"),
+        "order_id": purchase.get("order_id"),
+        "created_at": purchase["created_at"].isoformat(),
+        "amount": purchase["amount"],
+        "seller_commission": purchase["seller_commission"],
+        "seller_earnings": purchase["seller_earnings"]
+    }
+
+def export_response(chunks, name: str, format: str, start: Optional[datetime], end: Optional[datetime]):
+    period = "_".join(moment.date().isoformat() for moment in (start, end) if moment) or "all"
+    return StreamingResponse(chunks, media_type=EXPORT_MEDIA_TYPES[format], headers={
+        "Content-Disposition": f'attachment; filename="{name}_{period}.{format}"'
+    })
+
+def validate_export(format: str, start: Optional[datetime], end: Optional[datetime]):
+    """Check the export parameters before streaming starts; returns the bounds as naive local times"""
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_MEDIA_TYPES)}")
+    # Purchases are stamped with naive local times (datetime.now())
+    start, end = (
+        moment.astimezone().replace(tzinfo=None) if moment and moment.tzinfo else moment
+        for moment in (start, end)
+    )
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return start, end
+
+@app.get("/admin/export/purchases")
+async def export_purchases(start: Optional[datetime] = None, end: Optional[datetime] = None, format: str = "csv",
+                           current_user: dict = Depends(require_admin)):
+    """Stream every purchase created in [start, end), oldest first, as CSV or NDJSON"""
+    start, end = validate_export(format, start, end)
+    encode = export_encoder(format)
+    
+    async def chunks():
+        if format == "csv":
+            yield (",".join(EXPORT_COLUMNS) + "\r\n").encode()
+        for batch in purchases_db.between(start, end, batch_size=EXPORT_BATCH_SIZE):
+            yield encode([purchase_export_row(p, users_db.get(p["seller_id"])) for p in batch])
+            await asyncio.sleep(0)  # let other requests run between batches
+    
+    return export_response(chunks(), "purchases", format, start, end)
+
+@app.get("/admin/export/payouts")
+async def export_payouts(start: Optional[datetime] = None, end: Optional[datetime] = None, format: str = "csv",
+                         include_items: bool = True, current_user: dict = Depends(require_admin)):
+    """Stream one payout total per seller for [start, end), each preceded by its purchases when include_items.
+
+    Earnings use the commission recorded on each purchase, not the current setting.
+    """
+    start, end = validate_export(format, start, end)
+    encode = export_encoder(format)
+    
+    async def chunks():
+        if format == "csv":
+            yield (",".join(EXPORT_COLUMNS) + "\r\n").encode()
+        for seller_id in purchases_db.sellers():
+            seller = users_db.get(seller_id)
+            count, amount, earnings = 0, 0, 0.0
+            for batch in purchases_db.between(start, end, seller_id=seller_id, batch_size=EXPORT_BATCH_SIZE):
+                for purchase in batch:
+                    count += 1
+                    amount += purchase["amount"]
+                    earnings += purchase["seller_earnings"]
+                if include_items:
+                    yield encode([purchase_export_row(p, seller) for p in batch])
+                await asyncio.sleep(0)
+            if count:
+                yield encode([{
+                    "record_type": "payout",
+                    "seller_id": seller_id,
+                    "seller_name": seller.name if seller else None,
+                    "seller_email": seller.email if seller else None,
+                    "amount": amount,
+                    "seller_earnings": round(earnings, 2),
+                    "purchases": count,
+                    "bank_details": seller.bank_details if seller else None
+                }])
+    
+    return export_response(chunks(), "payouts", format, start, end)
+
+@app.post("/admin/trending/refresh")
+async def refresh_trending_now(current_user: dict = Depends(require_admin)):
+    """Run a trending scoring pass immediately instead of waiting for the next interval"""
+    await refresh_trending()
+    return {"success": True, "trending": trending_scorer.trending, "featured": trending_scorer.featured}
+
+@app.get("/admin/profiler", response_class=PlainTextResponse)
+async def get_profiler_stacks(current_user: dict = Depends(require_admin)):
+    """Folded stacks sampled during slow requests, for flamegraph.pl or speedscope"""
+    return profiler.folded()
+
+@app.put("/admin/profiler")
+async def configure_profiler(enabled: bool, threshold_ms: Optional[float] = None, reset: bool = False, current_user: dict = Depends(require_admin)):
+    """Turn slow-request profiling on or off, optionally changing the threshold"""
+    if threshold_ms is not None:
+        if threshold_ms <= 0:
+            raise HTTPException(status_code=400, detail="threshold_ms must be positive")
+        profiler.threshold = threshold_ms / 1000
+    if reset:
+        profiler.reset()
+    if enabled:
+        profiler.start()
+    else:
+        profiler.stop()
+    return {
+        "enabled": profiler.enabled,
+        "threshold_ms": profiler.threshold * 1000,
+        "slow_requests": profiler.slow_requests
     }
 
 @app.put("/admin/settings/update")
-async def update_admin_settings(key: str, value: str):
+async def update_admin_settings(key: str, value: str, current_user: dict = Depends(require_admin)):
     """Update admin settings"""
     if key in admin_settings:
         admin_settings[key] = value
@@ -546,10 +1798,13 @@ async def create_review(
     current_user: dict = Depends(get_current_user)
 ):
     """Create template review"""
-    template = next((t for t in templates_db if t.id == review_data.template_id), None)
+    template = templates_db.get(review_data.template_id)
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
     
+    if not validate_rating(review_data.rating):
+        raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
+    
     review_id = str(uuid.uuid4())
     review = {
         "id": review_id,
@@ -560,49 +1815,118 @@ async def create_review(
         "created_at": datetime.now()
     }
     
-    reviews_db.append(review)
+    await database.apply(
+        Changes()
+        .insert("reviews", review)
+        .increment("templates", template.id, rating_sum=review_data.rating, reviews_count=1)
+    )
+    reviews_db.add(review)
     
-    # Update template rating
-    template_reviews = [r for r in reviews_db if r["template_id"] == review_data.template_id]
-    avg_rating = sum(r["rating"] for r in template_reviews) / len(template_reviews)
-    template.rating = round(avg_rating, 1)
-    template.reviews_count = len(template_reviews)
+    # Update template rating incrementally
+    apply_ratings(template, [review_data.rating])
+    catalog_cache.invalidate_template(template)
     
     return {"success": True, "review_id": review_id}
 
+@app.get("/templates/{template_id}/reviews")
+async def get_template_reviews(template_id: str, limit: int = 20, offset: int = 0):
+    """List a template's reviews, most recently added first"""
+    template = templates_db.get(template_id)
+    if not template:
+        raise HTTPException(status_code=404, detail="Template not found")
+    
+    return {
+        "reviews": [
+            {
+                "id": r["id"],
+                "user_id": r["user_id"],
+                "rating": r["rating"],
+                "comment": r["comment"],
+                "created_at": r["created_at"].isoformat()
+            }
+            for r in reviews_db.for_template(template_id, limit=limit, offset=offset)
+        ],
+        "rating": template.rating,
+        "total": template.reviews_count,
+        "has_more": offset + limit < template.reviews_count
+    }
+
+@app.post("/admin/reviews/import")
+async def import_reviews(reviews: List[ReviewImport], current_user: dict = Depends(require_admin)):
+    """Bulk import reviews, updating each template's rating once; future-dated reviews are skipped"""
+    ratings_by_template: Dict[str, List[int]] = {}
+    accepted = []
+    skipped = []
+    now = datetime.now()
+    
+    for index, review_data in enumerate(reviews):
+        created_at = review_data.created_at or now
+        if created_at.tzinfo is not None:
+            # Stored timestamps are naive local time
+            created_at = created_at.astimezone().replace(tzinfo=None)
+        if (not templates_db.get(review_data.template_id) or not validate_rating(review_data.rating)
+                or created_at > now):
+            skipped.append(index)
+            continue
+        accepted.append({
+            "id": str(uuid.uuid4()),
+            "template_id": review_data.template_id,
+            "user_id": review_data.user_id,
+            "rating": review_data.rating,
+            "comment": review_data.comment,
+            "created_at": created_at
+        })
+        ratings_by_template.setdefault(review_data.template_id, []).append(review_data.rating)
+    
+    changes = Changes().insert("reviews", *accepted)
+    for template_id, ratings in ratings_by_template.items():
+        changes.increment("templates", template_id, rating_sum=sum(ratings), reviews_count=len(ratings))
+    await database.apply(changes)
+    
+    for review in accepted:
+        reviews_db.add(review)
+    for template_id, ratings in ratings_by_template.items():
+        template = templates_db.get(template_id)
+        apply_ratings(template, ratings)
+        catalog_cache.invalidate_template(template)
+    
+    return {
+        "success": True,
+        "imported": len(reviews) - len(skipped),
+        "skipped": skipped,
+        "templates_updated": len(ratings_by_template)
+    }
+
 # Dashboard endpoints
-@app.get("/dashboard/seller")
+@app.get("/dashboard/seller", response_model=SellerDashboardResponse)
 async def get_seller_dashboard(current_user: dict = Depends(get_current_user)):
     """Get seller dashboard data"""
     if current_user["user_type"] != "seller":
         raise HTTPException(status_code=403, detail="Access denied")
     
-    user_templates = [t for t in templates_db if t.user_id == current_user["id"]]
-    user_purchases = [p for p in purchases_db if any(t.id == p.get("template_id") and t.user_id == current_user["id"] for t in templates_db)]
+    user_templates = templates_db.by_seller(current_user["id"])
+    totals = templates_db.seller_totals(current_user["id"])
     
-    total_earnings = sum(p.get("amount", 0) * admin_settings["seller_commission"] for p in user_purchases)
-    total_downloads = sum(t.downloads for t in user_templates)
-    total_views = sum(t.views for t in user_templates)
-    
-    return {
-        "total_earnings": total_earnings,
-        "total_downloads": total_downloads,
+    fields = {
+        "total_earnings": totals["earnings"],
+        "total_downloads": totals["downloads"],
         "total_templates": len(user_templates),
-        "total_views": total_views,
-        "templates": [
-            {
-                "id": t.id,
-                "title": t.title,
-                "downloads": t.downloads,
-                "views": t.views,
-                "rating": t.rating,
-                "status": t.status,
-                "earnings": sum(p.get("amount", 0) * admin_settings["seller_commission"] 
-                              for p in user_purchases if p.get("template_id") == t.id)
-            }
-            for t in user_templates
-        ]
+        "total_views": totals["views"],
+        "total_sales": totals["sales"]
     }
+    if len(user_templates) > STREAM_PAGE_SIZE:
+        return StreamingResponse(
+            stream_page(fields, "templates", user_templates, dashboard_card), media_type="application/json"
+        )
+    with stage("dashboard_serialize"):
+        body = encode_page(fields, "templates", [dashboard_card(t) for t in user_templates])
+    return Response(content=body, media_type="application/json")
+
+# Monitoring endpoints
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Request, stage and event loop metrics in the Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     import uvicorn
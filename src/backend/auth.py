@@ -0,0 +1,130 @@
+"""Password hashing and JWT access tokens.
+
+bcrypt is deliberately slow, so hashing and verification run on a small
+dedicated thread pool: a burst of logins queues there instead of stalling the
+event loop or starving the default pool used for file I/O. Decoded token
+claims are kept in a bounded LRU cache keyed by the raw token, so an
+authenticated request normally costs one dict lookup instead of a signature
+check. Entries never outlive the token's own expiry.
+"""
+import asyncio
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from jose import JWTError, jwt
+from passlib.context import CryptContext
+
+# Required: no token is issued or accepted until it is set
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+ACCESS_TOKEN_TTL = timedelta(minutes=int(os.getenv("ACCESS_TOKEN_TTL_MINUTES", str(24 * 60))))
+
+_password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+_hash_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", "4")), thread_name_prefix="bcrypt"
+)
+_dummy_hash: Optional[str] = None
+
+
+class InvalidToken(Exception):
+    """The token is malformed, has a bad signature or has expired"""
+
+
+class SigningKeyMissing(Exception):
+    """JWT_SECRET_KEY is not configured"""
+
+
+def _signing_key() -> str:
+    if not JWT_SECRET_KEY:
+        raise SigningKeyMissing("JWT_SECRET_KEY is not set")
+    return JWT_SECRET_KEY
+
+
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, _password_context.hash, password)
+
+
+async def verify_password(password: str, password_hash: Optional[str]) -> bool:
+    """Check a password against a stored hash; a missing hash still costs one bcrypt round"""
+    global _dummy_hash
+    loop = asyncio.get_running_loop()
+    if not password_hash:
+        # Spend the same time as a real check so unknown accounts can't be told apart
+        if _dummy_hash is None:
+            _dummy_hash = await hash_password(secrets.token_hex(16))
+        await loop.run_in_executor(_hash_executor, _password_context.verify, password, _dummy_hash)
+        return False
+    return await loop.run_in_executor(_hash_executor, _password_context.verify, password, password_hash)
+
+
+def create_access_token(user: Any, ttl: timedelta = ACCESS_TOKEN_TTL) -> str:
+    now = datetime.now(timezone.utc)
+    claims = {
+        "sub": user.id,
+        "email": user.email,
+        "name": user.name,
+        "user_type": user.user_type,
+        "iat": now,
+        "exp": now + ttl,
+    }
+    return jwt.encode(claims, _signing_key(), algorithm=JWT_ALGORITHM)
+
+
+class TokenCache:
+    """LRU of verified token claims; an entry expires with its token"""
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token: str, claims: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[token] = (claims, float(claims["exp"]))
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(int(os.getenv("TOKEN_CACHE_SIZE", "10000")))
+
+
+def decode_access_token(token: str) -> Dict[str, Any]:
+    """Verified claims of an access token, from the cache when it was seen before"""
+    key = _signing_key()
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+    try:
+        claims = jwt.decode(token, key, algorithms=[JWT_ALGORITHM])
+    except JWTError as error:
+        raise InvalidToken(str(error)) from None
+    if "sub" not in claims or "exp" not in claims:
+        raise InvalidToken("Token is missing required claims")
+    token_cache.put(token, claims)
+    return claims
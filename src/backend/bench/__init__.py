@@ -0,0 +1,11 @@
+"""In-process load benchmarks for the backend API.
+
+Run from src/backend:
+
+    python -m bench --templates 10000 --requests 2000 --concurrency 32
+
+The stores are seeded with synthetic data, the app runs in-process behind an
+ASGI transport with the fake payment gateway, and a JSON report with latency
+percentiles, throughput and memory per scenario is written to bench/results/.
+Pass --baseline with an earlier report to see the change per scenario.
+"""
@@ -0,0 +1,272 @@
+"""Benchmark runner: seed, drive each scenario concurrently, write a JSON report"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+SCENARIOS = ("templates_browse", "templates_search", "create_order", "create_review", "seller_dashboard")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+Request = Tuple[str, str, Dict[str, Any]]
+
+
+def rss_bytes() -> int:
+    """Current resident set size, falling back to the peak where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_scenarios(app: Any, auth: Any, data: Dict[str, Any]) -> Dict[str, Callable[[random.Random], Request]]:
+    """Request factories per scenario, each drawing its inputs from the seeded data"""
+    buyer_tokens = {
+        user_id: auth.create_access_token(app.users_db.get(user_id)) for user_id in data["buyer_ids"][:500]
+    }
+    seller_tokens = {
+        user_id: auth.create_access_token(app.users_db.get(user_id)) for user_id in data["seller_ids"][:200]
+    }
+    buyers = list(buyer_tokens.items())
+    sellers = list(seller_tokens.items())
+    sorts = [None, "created_at", "downloads", "rating"]
+
+    def bearer(token: str) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {token}"}
+
+    def templates_browse(rng: random.Random) -> Request:
+        params = {"limit": 20, "offset": rng.choice([0, 0, 0, 20, 40, 100])}
+        if rng.random() < 0.6:
+            params["category"] = rng.choice(data["categories"])
+        if rng.random() < 0.3:
+            params["is_free"] = rng.choice(["true", "false"])
+        sort = rng.choice(sorts)
+        if sort:
+            params["sort"] = sort
+        return "GET", "/templates", {"params": params}
+
+    def templates_search(rng: random.Random) -> Request:
+        params = {"search": rng.choice(data["search_terms"])[:rng.randint(3, 6)], "limit": 20}
+        if rng.random() < 0.3:
+            params["category"] = rng.choice(data["categories"])
+        return "GET", "/templates", {"params": params}
+
+    def create_order(rng: random.Random) -> Request:
+        _, token = rng.choice(buyers)
+        return "POST", "/payment/create-order", {
+            "data": {"template_id": rng.choice(data["approved_ids"])}, "headers": bearer(token)
+        }
+
+    def create_review(rng: random.Random) -> Request:
+        _, token = rng.choice(buyers)
+        return "POST", "/reviews/create", {
+            "json": {"template_id": rng.choice(data["approved_ids"]), "rating": rng.randint(1, 5),
+                     "comment": "Benchmark review"},
+            "headers": bearer(token)
+        }
+
+    def seller_dashboard(rng: random.Random) -> Request:
+        _, token = rng.choice(sellers)
+        return "GET", "/dashboard/seller", {"headers": bearer(token)}
+
+    return {
+        "templates_browse": templates_browse,
+        "templates_search": templates_search,
+        "create_order": create_order,
+        "create_review": create_review,
+        "seller_dashboard": seller_dashboard,
+    }
+
+
+async def run_scenario(client: Any, make_request: Callable[[random.Random], Request], requests: int,
+                       concurrency: int, rng: random.Random) -> Dict[str, Any]:
+    """Issue requests from concurrency workers and summarize latency and throughput"""
+    planned = [make_request(rng) for _ in range(requests)]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    position = 0
+
+    async def worker():
+        nonlocal position
+        while position < len(planned):
+            method, url, kwargs = planned[position]
+            position += 1
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if int(status) >= 400)
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 3),
+            "p90": round(percentile(latencies, 0.90) * 1000, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000, 3),
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0
+        },
+        "statuses": statuses,
+        "error_rate": round(errors / len(latencies), 4) if latencies else 0.0,
+        "rss_after_bytes": rss_bytes()
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Dict[str, Optional[float]]]:
+    """Relative change per scenario against an earlier report (positive latency change is slower)"""
+    def change(new: float, old: float) -> Optional[float]:
+        return round((new - old) / old * 100, 2) if old else None
+
+    changes = {}
+    for name, result in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        changes[name] = {
+            "p50_change_pct": change(result["latency_ms"]["p50"], previous["latency_ms"]["p50"]),
+            "p99_change_pct": change(result["latency_ms"]["p99"], previous["latency_ms"]["p99"]),
+            "throughput_change_pct": change(result["throughput_rps"], previous["throughput_rps"])
+        }
+    return changes
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m bench", description=__doc__)
+    parser.add_argument("--templates", type=int, default=10_000, help="catalog size (10k-1M)")
+    parser.add_argument("--users", type=int, help="default: 2x templates")
+    parser.add_argument("--sellers", type=int, help="default: templates / 20")
+    parser.add_argument("--reviews", type=int, help="default: 2x templates")
+    parser.add_argument("--purchases", type=int, help="default: templates")
+    parser.add_argument("--discounts", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=200, help="unmeasured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset")
+    parser.add_argument("--gateway-latency", type=float, default=0.0, help="simulated Razorpay latency, seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="report path (default: bench/results/<revision>-<time>.json)")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    args = parser.parse_args(argv)
+    args.users = args.users or args.templates * 2
+    args.sellers = args.sellers or max(1, args.templates // 20)
+    args.reviews = args.reviews if args.reviews is not None else args.templates * 2
+    args.purchases = args.purchases if args.purchases is not None else args.templates
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+async def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+
+    # The app reads its configuration at import time
+    os.environ.pop("DATABASE_URL", None)
+    os.environ["PAYMENT_GATEWAY"] = "fake"
+    os.environ["FAKE_GATEWAY_LATENCY"] = str(args.gateway_latency)
+    os.environ.setdefault("STORAGE_ROOT", tempfile.mkdtemp(prefix="bench-storage-"))
+    os.environ.setdefault("TRENDING_INTERVAL", "3600")
+    os.environ.setdefault("JWT_SECRET_KEY", "bench")
+    import httpx
+
+    import app
+    import auth
+    from bench.seed import seed
+
+    rss_start = rss_bytes()
+    await app.app.router.startup()
+    seed_started = time.perf_counter()
+    data = seed(app, templates=args.templates, users=args.users, sellers=args.sellers, reviews=args.reviews,
+                purchases=args.purchases, discounts=args.discounts, seed=args.seed)
+    seed_elapsed = time.perf_counter() - seed_started
+    rss_seeded = rss_bytes()
+    print(f"Seeded {args.templates} templates in {seed_elapsed:.1f}s, RSS {rss_seeded / 2**20:.0f} MiB", file=sys.stderr)
+
+    scenarios = build_scenarios(app, auth, data)
+    results = {}
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in args.scenarios.split(","):
+            rng = random.Random(f"{args.seed}-{name}")
+            if args.warmup:
+                await run_scenario(client, scenarios[name], args.warmup, args.concurrency, rng)
+            results[name] = run = await run_scenario(client, scenarios[name], args.requests, args.concurrency, rng)
+            print(f"{name:18} p50 {run['latency_ms']['p50']:8.2f} ms  p99 {run['latency_ms']['p99']:8.2f} ms  "
+                  f"{run['throughput_rps']:9.1f} req/s  errors {run['error_rate']:.1%}", file=sys.stderr)
+    await app.app.router.shutdown()
+
+    report = {
+        "version": 1,
+        "revision": git_revision(),
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "orjson": "orjson" in sys.modules
+        },
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "seed": {"elapsed_s": round(seed_elapsed, 3), "counts": {
+            "users": len(app.users_db), "templates": len(app.templates_db), "reviews": len(app.reviews_db),
+            "purchases": len(app.purchases_db), "discounts": len(app.discounts_db)
+        }},
+        "memory": {"rss_start_bytes": rss_start, "rss_seeded_bytes": rss_seeded, "peak_rss_bytes": peak_rss_bytes()},
+        "scenarios": results
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(report, json.load(f))
+        for name, changes in report["comparison"].items():
+            print(f"{name:18} vs baseline: p50 {changes['p50_change_pct']}%  p99 {changes['p99_change_pct']}%  "
+                  f"throughput {changes['throughput_change_pct']}%", file=sys.stderr)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{report['revision'] or 'local'}-{args.templates}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {output}", file=sys.stderr)
+    return report
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
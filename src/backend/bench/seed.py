@@ -0,0 +1,118 @@
+"""Synthetic marketplace data written straight into the in-memory stores"""
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+CATEGORIES = ["Business", "Marketing", "Education", "Design", "Finance", "Productivity", "Social Media", "Web"]
+PLANS = ["free", "free", "free", "starter", "pro", "enterprise"]
+
+
+def _vocabulary(rng: random.Random, size: int = 5000) -> List[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size)]
+
+
+def seed(app: Any, templates: int, users: int, sellers: int, reviews: int, purchases: int,
+         discounts: int, seed: int = 1) -> Dict[str, Any]:
+    """Populate the app module's stores; returns the ids the scenarios draw from"""
+    rng = random.Random(seed)
+    words = _vocabulary(rng)
+    now = datetime.now()
+
+    seller_ids = []
+    buyer_ids = []
+    for index in range(users):
+        is_seller = index < sellers
+        user = app.User(
+            id=str(uuid.UUID(int=rng.getrandbits(128))),
+            email=f"user{index}@bench.example",
+            name=f"Bench User {index}",
+            user_type="seller" if is_seller else "buyer",
+            plan=rng.choice(PLANS)
+        )
+        user.created_at = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        app.users_db.add(user)
+        app.activity.record("signups", user.created_at)
+        (seller_ids if is_seller else buyer_ids).append(user.id)
+
+    catalog = []
+    for index in range(templates):
+        price = rng.choice([0, 49, 99, 199, 499, 999])
+        template = app.Template(
+            id=str(uuid.UUID(int=rng.getrandbits(128))),
+            title=" ".join(rng.choices(words, k=rng.randint(2, 5))).title(),
+            description=" ".join(rng.choices(words, k=rng.randint(15, 40))),
+            price=price,
+            user_id=rng.choice(seller_ids),
+            category=rng.choice(CATEGORIES),
+            tags=rng.sample(words[:300], rng.randint(1, 4)),
+            status="approved" if rng.random() < 0.9 else rng.choice(["pending", "rejected"]),
+            is_free=price == 0
+        )
+        template.created_at = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        template.downloads = int(rng.paretovariate(1.2)) - 1
+        template.views = template.downloads * rng.randint(3, 20)
+        catalog.append(template)
+
+    # Reviews and purchases roll up into the templates before they are indexed
+    for _ in range(reviews):
+        template = rng.choice(catalog)
+        rating = rng.choices([1, 2, 3, 4, 5], weights=[1, 1, 3, 6, 8])[0]
+        app.reviews_db.add({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "template_id": template.id,
+            "user_id": rng.choice(buyer_ids),
+            "rating": rating,
+            "comment": " ".join(rng.choices(words, k=8)),
+            "created_at": now - timedelta(seconds=rng.randint(0, 180 * 24 * 3600))
+        })
+        template.rating_sum += rating
+        template.reviews_count += 1
+    commission = float(app.admin_settings["seller_commission"])
+    paid = [t for t in catalog if t.price > 0]
+    ledger = []
+    for _ in range(purchases if paid else 0):
+        template = rng.choice(paid)
+        earnings = round(template.price * commission, 2)
+        purchase = {
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "template_id": template.id,
+            "user_id": rng.choice(buyer_ids),
+            "seller_id": template.user_id,
+            "amount": template.price,
+            "seller_commission": commission,
+            "seller_earnings": earnings,
+            "payment_id": f"pay_{uuid.UUID(int=rng.getrandbits(128)).hex[:14]}",
+            "order_id": None,
+            "created_at": now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        }
+        ledger.append(purchase)
+        app.activity.record_purchase(purchase)
+        template.sales += 1
+        template.earnings += earnings
+    # Generated in random time order; a bulk load sorts the time index once
+    app.purchases_db.extend(ledger)
+
+    for template in catalog:
+        if template.reviews_count:
+            template.rating = round(template.rating_sum / template.reviews_count, 1)
+        app.templates_db.add(template)
+
+    for _ in range(discounts):
+        app.discounts_db.add({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "percentage": rng.randint(30, 55),
+            "expires_at": now + timedelta(hours=rng.randint(1, 72)),
+            "template_ids": [t.id for t in rng.sample(catalog, min(len(catalog), 20))] if rng.random() < 0.8 else None,
+            "created_at": now
+        })
+
+    return {
+        "buyer_ids": buyer_ids,
+        "seller_ids": seller_ids,
+        "approved_ids": [t.id for t in catalog if t.status == "approved" and t.price > 0],
+        "search_terms": [word for template in rng.sample(catalog, min(len(catalog), 500))
+                         for word in template.title.lower().split()[:1]],
+        "categories": CATEGORIES
+    }
@@ -0,0 +1,112 @@
+"""Serialized response cache for catalog reads.
+
+Entries are keyed on normalized query parameters and bounded by an LRU size
+limit and a TTL. Each entry remembers which templates it lists and a predicate
+telling whether a given template would qualify for it. When a template changes,
+only the entries that list it, or that it could now enter, are dropped. The TTL
+bounds how stale the frequently changing counters (downloads, views) can get.
+"""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Set
+
+
+class CacheEntry(NamedTuple):
+    body: bytes
+    etag: str
+    template_ids: frozenset
+    qualifies: Callable[[Any], bool]
+    expires_at: float
+
+
+def normalize_key(params: Dict[str, Any]) -> str:
+    """Stable key for a parameter set, ignoring unset values and ordering"""
+    return json.dumps({k: v for k, v in params.items() if v is not None}, sort_keys=True, separators=(",", ":"))
+
+
+class ResponseCache:
+    """LRU + TTL cache of response bodies with targeted invalidation"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._by_template: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            self._drop(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, body: bytes, template_ids: Iterable[str],
+            qualifies: Callable[[Any], bool]) -> CacheEntry:
+        if key in self._entries:
+            self._drop(key)
+        entry = CacheEntry(
+            body=body,
+            etag=hashlib.blake2b(body, digest_size=16).hexdigest(),
+            template_ids=frozenset(template_ids),
+            qualifies=qualifies,
+            expires_at=time.monotonic() + self.ttl
+        )
+        self._entries[key] = entry
+        for template_id in entry.template_ids:
+            self._by_template.setdefault(template_id, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+        return entry
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for template_id in entry.template_ids:
+            keys = self._by_template.get(template_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_template[template_id]
+
+    def invalidate_template(self, template: Any) -> int:
+        """Drop entries listing a template or that it now qualifies for; returns how many"""
+        stale = set(self._by_template.get(template.id, ()))
+        stale.update(key for key, entry in self._entries.items() if entry.qualifies(template))
+        for key in stale:
+            self._drop(key)
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._by_template.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
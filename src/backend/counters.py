@@ -0,0 +1,95 @@
+"""Write-coalescing buffer for high-frequency counters (views, downloads).
+
+Recording an event adds its deltas to an in-memory entry per (table, key), so
+a thousand views of one template between flushes become a single
+``views = views + 1000`` write. The buffer is flushed in one batch every
+interval, or sooner once max_keys distinct rows are pending. Counters are
+eventually consistent: readers see them as of the last flush, and a crash loses
+at most the events recorded since then. A failed flush is merged back and
+retried with the next batch.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (table, key) -> column -> pending delta
+Batch = Dict[Tuple[str, str], Dict[str, int]]
+
+
+class CounterBuffer:
+    """Pending counter deltas, merged per row and flushed in batches"""
+
+    def __init__(self, flush: Callable[[Batch], Awaitable[None]], interval: float = 2.0, max_keys: int = 10_000):
+        self._flush = flush
+        self.interval = interval
+        self.max_keys = max_keys
+        self._pending: Batch = {}
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self.events = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.failures = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, table: str, key: str, **deltas: int) -> None:
+        """Record an event; cheap enough to call on every request"""
+        entry = self._pending.get((table, key))
+        if entry is None:
+            entry = self._pending[(table, key)] = {}
+            if len(self._pending) >= self.max_keys:
+                self._full.set()
+        for column, delta in deltas.items():
+            entry[column] = entry.get(column, 0) + delta
+        self.events += 1
+
+    def pending(self, table: str, key: str) -> Dict[str, int]:
+        """Deltas recorded for a row but not flushed yet"""
+        return dict(self._pending.get((table, key), {}))
+
+    async def flush(self) -> int:
+        """Write everything pending as one batch; returns the number of rows written"""
+        async with self._lock:
+            batch, self._pending = self._pending, {}
+            self._full.clear()
+            if not batch:
+                return 0
+            try:
+                await self._flush(batch)
+            except Exception:
+                # Put the deltas back so the next flush retries them
+                for row, deltas in batch.items():
+                    entry = self._pending.setdefault(row, {})
+                    for column, delta in deltas.items():
+                        entry[column] = entry.get(column, 0) + delta
+                self.failures += 1
+                raise
+            self.flushes += 1
+            self.rows_written += len(batch)
+            return len(batch)
+
+    async def run(self) -> None:
+        """Flush every interval, or as soon as the buffer fills up"""
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Counter flush failed; %d rows kept for retry", len(self._pending))
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        return {
+            "pending_rows": len(self._pending),
+            "events": self.events,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "failures": self.failures,
+            "flush_interval_seconds": self.interval
+        }
@@ -0,0 +1,131 @@
+"""Background pipeline producing resized WebP derivatives of uploaded images.
+
+Thumbnails and preview images are stored at their original size. After an
+upload the pipeline renders each image at DERIVATIVE_WIDTHS in a process pool,
+off the request path, and caches the results on disk next to the object store
+under derivatives/<digest>/<width>.webp. Because they are keyed by content
+hash, an image uploaded twice is rendered once.
+"""
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_WIDTHS = (320, 640, 1280)
+WEBP_QUALITY = 80
+# Seconds before re-checking the disk for an image whose derivatives were missing
+# or incomplete, e.g. still being rendered by another worker
+DISK_RECHECK_INTERVAL = 30.0
+
+
+def render_derivatives(source_path: str, target_dir: str, widths: Sequence[int], quality: int) -> Tuple[int, ...]:
+    """Write one WebP per width (never upscaling) and return the widths available; runs in a worker process"""
+    from PIL import Image, ImageOps
+
+    os.makedirs(target_dir, exist_ok=True)
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            has_alpha = image.mode in ("LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+        for width in widths:
+            path = os.path.join(target_dir, f"{width}.webp")
+            if os.path.exists(path):
+                continue
+            resized = image
+            if image.width > width:
+                resized = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            temp_path = f"{path}.tmp"
+            resized.save(temp_path, "WEBP", quality=quality, method=4)
+            os.replace(temp_path, path)
+    return tuple(widths)
+
+
+class DerivativePipeline:
+    """Schedules derivative rendering and resolves the best variant URL for a width"""
+
+    def __init__(self, root: str, widths: Sequence[int] = DERIVATIVE_WIDTHS, quality: int = WEBP_QUALITY,
+                 max_workers: Optional[int] = None):
+        self.root = os.path.join(root, "derivatives")
+        self.widths = tuple(sorted(widths))
+        self.quality = quality
+        self.max_workers = max_workers or int(os.getenv("DERIVATIVE_WORKERS", "2"))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._ready: Dict[str, Tuple[int, ...]] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        # Incomplete disk checks, digest -> (widths found, monotonic time checked)
+        self._checked: Dict[str, Tuple[Tuple[int, ...], float]] = {}
+
+    def _directory(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def path_for(self, digest: str, width: int) -> Optional[str]:
+        if width not in self.widths:
+            return None
+        path = os.path.join(self._directory(digest), f"{width}.webp")
+        return path if os.path.isfile(path) else None
+
+    def submit(self, digest: str, source_path: str) -> None:
+        """Render derivatives of a stored image in the background; safe to call repeatedly"""
+        if digest in self._pending or self._ready.get(digest):
+            return
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        future = asyncio.get_running_loop().run_in_executor(
+            self._executor, render_derivatives, source_path, self._directory(digest), self.widths, self.quality
+        )
+        self._pending[digest] = future
+        future.add_done_callback(lambda f: self._finished(digest, f))
+
+    def _finished(self, digest: str, future: asyncio.Future) -> None:
+        self._pending.pop(digest, None)
+        self._checked.pop(digest, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            # Not an image Pillow can read; remember so listings fall back to the original
+            logger.warning("Derivative rendering failed for %s: %s", digest, error)
+            self._ready[digest] = ()
+            return
+        self._ready[digest] = future.result()
+
+    def available_widths(self, digest: str) -> Tuple[int, ...]:
+        """Widths already rendered for an image, checking the disk cache after a restart.
+
+        Only a complete set found on disk is remembered for good; a missing or
+        partial one is re-checked every DISK_RECHECK_INTERVAL seconds.
+        """
+        widths = self._ready.get(digest)
+        if widths is not None:
+            return widths
+        if digest in self._pending:
+            return ()
+        checked = self._checked.get(digest)
+        now = time.monotonic()
+        if checked and now - checked[1] < DISK_RECHECK_INTERVAL:
+            return checked[0]
+        widths = tuple(w for w in self.widths if self.path_for(digest, w))
+        if widths == self.widths:
+            self._checked.pop(digest, None)
+            self._ready[digest] = widths
+        else:
+            self._checked[digest] = (widths, now)
+        return widths
+
+    def variant_url(self, digest: str, width: int) -> Optional[str]:
+        """URL of the smallest rendered variant at least width wide (else the largest), if any"""
+        widths = self.available_widths(digest)
+        if not widths:
+            return None
+        chosen = next((w for w in widths if w >= width), widths[-1])
+        return f"/storage/derivatives/{digest}/{chosen}.webp"
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
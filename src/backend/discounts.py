@@ -0,0 +1,76 @@
+"""Time-indexed store of promotional discounts.
+
+Discounts are never deleted; once expired they are simply ignored. Checkout
+only needs the best discount that is still live, so each template (and the set
+of catalog-wide discounts) keeps a max-heap on percentage whose expired tops are
+popped lazily, and a min-heap of expirations keeps the active count current.
+"""
+import heapq
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# (-percentage, expires_at, discount id): the best discount sits on top
+_OfferHeap = List[Tuple[int, datetime, str]]
+
+
+class DiscountStore:
+    """Discounts indexed by id, by template and by expiry"""
+
+    def __init__(self):
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._expirations: List[Tuple[datetime, str]] = []
+        self._by_template: Dict[str, _OfferHeap] = {}
+        self._global: _OfferHeap = []
+        self._active = 0
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._by_id.values())
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def add(self, discount: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Insert a discount; one without template_ids applies to every template"""
+        now = now or datetime.now()
+        self._by_id[discount["id"]] = discount
+        offer = (-discount["percentage"], discount["expires_at"], discount["id"])
+        if discount.get("template_ids"):
+            for template_id in set(discount["template_ids"]):
+                heapq.heappush(self._by_template.setdefault(template_id, []), offer)
+        else:
+            heapq.heappush(self._global, offer)
+        if discount["expires_at"] > now:
+            heapq.heappush(self._expirations, (discount["expires_at"], discount["id"]))
+            self._active += 1
+        return discount
+
+    def get(self, discount_id: str) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(discount_id)
+
+    def _evict(self, now: datetime) -> None:
+        while self._expirations and self._expirations[0][0] <= now:
+            heapq.heappop(self._expirations)
+            self._active -= 1
+
+    @staticmethod
+    def _best_live(offers: _OfferHeap, now: datetime) -> Optional[Tuple[int, datetime, str]]:
+        while offers and offers[0][1] <= now:
+            heapq.heappop(offers)
+        return offers[0] if offers else None
+
+    def best_for(self, template_id: str, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Highest-percentage live discount applying to a template"""
+        now = now or datetime.now()
+        candidates = [self._best_live(self._global, now)]
+        offers = self._by_template.get(template_id)
+        if offers is not None:
+            candidates.append(self._best_live(offers, now))
+            if not offers:
+                del self._by_template[template_id]
+        live = [offer for offer in candidates if offer is not None]
+        return self._by_id[min(live)[2]] if live else None
+
+    def active_count(self, now: Optional[datetime] = None) -> int:
+        """Number of discounts that have not expired yet"""
+        self._evict(now or datetime.now())
+        return self._active
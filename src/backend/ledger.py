@@ -0,0 +1,82 @@
+"""Group-committed appends to the payment ledger.
+
+Every captured payment becomes one append-only ledger entry (a purchase or a
+subscription activation). Entries are keyed by payment id: a second append
+with a key that is still being written waits for the first one instead of
+writing again, so a webhook retry racing the checkout's own verification
+credits the seller once.
+
+Appends queue up while a write is in flight and go out together in the next
+transaction, so a burst of payments during a sale costs a few commits rather
+than one per payment, without adding latency when traffic is light. If a batch
+fails (typically a payment already recorded by another worker), its entries
+are retried one by one so only the offending entry fails.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Entries written per transaction at most
+MAX_BATCH = 500
+
+
+class LedgerWriter:
+    """Queues keyed entries and commits them in batches through commit"""
+
+    def __init__(self, commit: Callable[[List[Any]], Awaitable[List[Any]]], max_batch: int = MAX_BATCH):
+        self._commit = commit
+        self.max_batch = max_batch
+        self._queue: List[Tuple[str, Any, asyncio.Future]] = []
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._writer: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.entries = 0
+        self.largest_batch = 0
+
+    def pending(self, key: str) -> bool:
+        return key in self._inflight
+
+    async def append(self, key: str, entry: Any) -> Any:
+        """Write entry once per key; returns what commit produced for it"""
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._inflight[key] = asyncio.get_running_loop().create_future()
+            self._queue.append((key, entry, future))
+            if self._writer is None or self._writer.done():
+                self._writer = asyncio.create_task(self._drain())
+        # Shielded so a cancelled caller neither cancels the write nor other waiters
+        return await asyncio.shield(future)
+
+    async def _drain(self) -> None:
+        while self._queue:
+            batch = self._queue[:self.max_batch]
+            del self._queue[:self.max_batch]
+            try:
+                results = await self._commit([entry for _, entry, _ in batch])
+                outcomes = list(zip(batch, results, [None] * len(batch)))
+            except Exception as error:
+                if len(batch) == 1:
+                    outcomes = [(batch[0], None, error)]
+                else:
+                    outcomes = []
+                    for item in batch:
+                        try:
+                            outcomes.append((item, (await self._commit([item[1]]))[0], None))
+                        except Exception as single_error:
+                            outcomes.append((item, None, single_error))
+            self.batches += 1
+            self.entries += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            for (key, _, future), result, error in outcomes:
+                del self._inflight[key]
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": len(self._queue),
+            "batches": self.batches,
+            "entries": self.entries,
+            "largest_batch": self.largest_batch
+        }
@@ -0,0 +1,251 @@
+"""Request metrics, stage timers, event loop lag and an opt-in sampling profiler.
+
+MetricsMiddleware records a latency and a response size histogram per route
+template (``/templates/{template_id}``, not the raw path, so label cardinality
+stays bounded). Handlers time their internal stages with ``stage("name")``.
+Everything is exposed in the Prometheus text format by ``registry.render()``.
+
+The profiler samples the event loop thread's stack every few milliseconds while
+enabled and keeps a short ring of samples. When a request takes longer than the
+threshold, the samples taken during it are folded into per-route stack counts,
+ready for flamegraph.pl or speedscope. The loop is shared, so those samples
+include whatever else the loop was running at the time; that is usually the
+point when hunting for what stalled a slow request.
+"""
+import asyncio
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+# Seconds; upper bounds of the latency buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Bytes; upper bounds of the response size buckets
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# Seconds; event loop lag is mostly well under a millisecond when healthy
+LAG_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative bucket counts plus sum and count, as Prometheus expects"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Named histograms and gauges keyed by label set; safe to update from worker threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str, Optional[Tuple[float, ...]]]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._gauges: Dict[str, Dict[Labels, Callable[[], float]]] = {}
+
+    def histogram(self, name: str, help: str, buckets: Tuple[float, ...]) -> None:
+        self._help[name] = ("histogram", help, buckets)
+        self._histograms.setdefault(name, {})
+
+    def gauge(self, name: str, help: str, read: Callable[[], float], **labels: str) -> None:
+        """Register a gauge whose value is read when the metrics are rendered"""
+        self._help.setdefault(name, ("gauge", help, None))
+        self._gauges.setdefault(name, {})[tuple(sorted(labels.items()))] = read
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms[name]
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self._help[name][2])
+            histogram.observe(value)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            for name, (kind, help, _) in self._help.items():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "histogram":
+                    for labels, histogram in self._histograms[name].items():
+                        cumulative = 0
+                        for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                            cumulative += count
+                            le = "+Inf" if bound == float("inf") else repr(float(bound))
+                            lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                        lines.append(f"{name}_sum{_labels(labels)} {histogram.sum!r}")
+                        lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+                else:
+                    for labels, read in self._gauges[name].items():
+                        lines.append(f"{name}{_labels(labels)} {float(read())!r}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+registry = MetricsRegistry()
+registry.histogram("http_request_duration_seconds", "Time to send the complete response", LATENCY_BUCKETS)
+registry.histogram("http_response_size_bytes", "Response body size", SIZE_BUCKETS)
+registry.histogram("stage_duration_seconds", "Time spent in a named stage of a handler", LATENCY_BUCKETS)
+registry.histogram("event_loop_lag_seconds", "How late the event loop woke a sleeping timer", LAG_BUCKETS)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the enclosed block as one observation of stage_duration_seconds"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe("stage_duration_seconds", time.perf_counter() - started, stage=name)
+
+
+async def monitor_loop_lag(interval: float = 0.5) -> None:
+    """Sleep for interval forever, recording how much later than requested each wake-up is"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        registry.observe("event_loop_lag_seconds", max(0.0, loop.time() - started - interval))
+
+
+class SamplingProfiler:
+    """Samples one thread's stack on a timer and folds the samples of slow requests"""
+
+    def __init__(self, interval: float = 0.005, threshold: float = 0.5, max_samples: int = 20_000,
+                 max_depth: int = 64):
+        self.interval = interval
+        self.threshold = threshold
+        self.max_depth = max_depth
+        self.slow_requests = 0
+        # (perf_counter, folded stack), oldest first
+        self._samples: Deque[Tuple[float, str]] = deque(maxlen=max_samples)
+        self._stacks: Counter = Counter()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._target: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._thread is not None
+
+    def start(self, thread_id: Optional[int] = None) -> None:
+        """Begin sampling thread_id, by default the calling (event loop) thread"""
+        if self._thread is not None:
+            return
+        self._target = thread_id if thread_id is not None else threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        with self._lock:
+            self._samples.clear()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None and len(names) < self.max_depth:
+                code = frame.f_code
+                names.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                frame = frame.f_back
+            folded = ";".join(reversed(names))
+            with self._lock:
+                self._samples.append((time.perf_counter(), folded))
+
+    def request_finished(self, route: str, started: float, finished: float) -> None:
+        """Fold the samples taken between started and finished if the request was slow"""
+        if self._thread is None or finished - started < self.threshold:
+            return
+        with self._lock:
+            self.slow_requests += 1
+            for taken, folded in reversed(self._samples):
+                if taken < started:
+                    break
+                if taken <= finished:
+                    self._stacks[f"{route};{folded}"] += 1
+
+    def folded(self) -> str:
+        """Collapsed stacks, one "frame;frame;... count" line each"""
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stacks.clear()
+            self.slow_requests = 0
+
+
+profiler = SamplingProfiler()
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request until its last body chunk is sent.
+
+    Plain ASGI rather than BaseHTTPMiddleware, so streamed responses are
+    neither buffered nor cut short and the overhead stays at a few calls.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finished = time.perf_counter()
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = getattr(scope.get("route"), "path", "unmatched")
+            registry.observe("http_request_duration_seconds", finished - started,
+                             method=scope["method"], route=route, status=str(status))
+            registry.observe("http_response_size_bytes", size, method=scope["method"], route=route)
+            profiler.request_finished(f"{scope['method']} {route}", started, finished)
@@ -0,0 +1,31 @@
+"""ledger and review change tracking
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 15:40:27.115302
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+TABLES = ('purchases', 'subscriptions', 'reviews', 'discounts')
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.create_index(op.f(f'ix_{table}_updated_at'), table, ['updated_at'], unique=False)
+    # Change replay selects on updated_at alone; rows written before it was stamped count as written when created
+    for table in TABLES + ('users', 'templates'):
+        op.execute(f"UPDATE {table} SET updated_at = created_at WHERE updated_at IS NULL")
+
+
+def downgrade() -> None:
+    for table in reversed(TABLES):
+        op.drop_index(op.f(f'ix_{table}_updated_at'), table_name=table)
+        op.drop_column(table, 'updated_at')
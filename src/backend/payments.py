@@ -0,0 +1,158 @@
+"""Non-blocking payment gateway adapters.
+
+The Razorpay SDK makes blocking HTTP calls, which would stall the event loop
+inside async handlers. RazorpayGateway talks to the Razorpay REST API through a
+pooled httpx.AsyncClient instead, with timeouts, a cap on in-flight requests and
+retries with exponential backoff. FakeGateway returns synthetic orders without
+any network traffic for local development and load testing.
+"""
+import asyncio
+import os
+import random
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Union
+
+import httpx
+
+RAZORPAY_API_URL = "https://api.razorpay.com/v1"
+
+# Responses worth retrying: rate limiting and server-side failures
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class PaymentGatewayError(Exception):
+    """Order creation failed, either rejected by the gateway or after all retries"""
+
+
+class PaymentGateway(ABC):
+    """Common interface of the payment gateway adapters"""
+
+    @abstractmethod
+    async def create_order(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create one order; raises PaymentGatewayError when it can't be created"""
+
+    async def create_orders(self, orders: List[Dict[str, Any]]) -> List[Union[Dict[str, Any], PaymentGatewayError]]:
+        """Create several orders concurrently; failed ones are returned as errors in place"""
+        return await asyncio.gather(
+            *(self.create_order(data) for data in orders),
+            return_exceptions=True
+        )
+
+    async def close(self) -> None:
+        pass
+
+
+class RazorpayGateway(PaymentGateway):
+    """Razorpay Orders API over a shared, pooled async HTTP client.
+
+    Retrying order creation is safe: an unpaid duplicate order is never charged
+    and simply expires on Razorpay's side.
+    """
+
+    def __init__(
+        self,
+        key_id: str,
+        key_secret: str,
+        timeout: float = 10.0,
+        max_connections: int = 100,
+        max_concurrency: int = 50,
+        max_retries: int = 3,
+        backoff: float = 0.25,
+        base_url: str = RAZORPAY_API_URL,
+    ):
+        self._auth = (key_id, key_secret)
+        self._timeout = httpx.Timeout(timeout, connect=min(timeout, 5.0))
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections
+        )
+        self._base_url = base_url
+        self._max_concurrency = max_concurrency
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created lazily so the client and semaphore bind to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self._base_url,
+                auth=self._auth,
+                timeout=self._timeout,
+                limits=self._limits
+            )
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._client
+
+    async def _post(self, path: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        client = self._get_client()
+        for attempt in range(self._max_retries + 1):
+            final_attempt = attempt == self._max_retries
+            try:
+                async with self._semaphore:
+                    response = await client.post(path, json=data)
+            except httpx.TransportError as e:
+                if final_attempt:
+                    raise PaymentGatewayError(f"Payment gateway unreachable: {e}") from e
+            else:
+                if response.status_code < 400:
+                    return response.json()
+                if response.status_code not in RETRYABLE_STATUS_CODES or final_attempt:
+                    raise PaymentGatewayError(self._error_message(response))
+            # Exponential backoff with jitter, outside the concurrency slot
+            await asyncio.sleep(self._backoff * (2 ** attempt) * (0.5 + random.random()))
+        raise PaymentGatewayError("Payment gateway retries exhausted")
+
+    @staticmethod
+    def _error_message(response: httpx.Response) -> str:
+        try:
+            return response.json()["error"]["description"]
+        except (ValueError, KeyError, TypeError):
+            return f"Payment gateway returned HTTP {response.status_code}"
+
+    async def create_order(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._post("/orders", data)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class FakeGateway(PaymentGateway):
+    """In-process stand-in for Razorpay that mints orders after an optional simulated latency"""
+
+    def __init__(self, latency: float = 0.0):
+        self._latency = latency
+
+    async def create_order(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        return {
+            "id": f"order_{uuid.uuid4().hex[:14]}",
+            "entity": "order",
+            "amount": data["amount"],
+            "amount_paid": 0,
+            "amount_due": data["amount"],
+            "currency": data.get("currency", "INR"),
+            "receipt": data.get("receipt"),
+            "status": "created",
+            "attempts": 0,
+            "notes": data.get("notes", {}),
+        }
+
+
+def create_gateway() -> PaymentGateway:
+    """Build the gateway selected by the PAYMENT_GATEWAY environment variable"""
+    if os.getenv("PAYMENT_GATEWAY", "razorpay") == "fake":
+        return FakeGateway(latency=float(os.getenv("FAKE_GATEWAY_LATENCY", "0")))
+    return RazorpayGateway(
+        key_id=os.getenv("RAZORPAY_KEY_ID", "your_key_id"),
+        key_secret=os.getenv("RAZORPAY_KEY_SECRET", "your_key_secret"),
+        timeout=float(os.getenv("RAZORPAY_TIMEOUT", "10")),
+        max_connections=int(os.getenv("RAZORPAY_MAX_CONNECTIONS", "100")),
+        max_concurrency=int(os.getenv("RAZORPAY_MAX_CONCURRENCY", "50")),
+        max_retries=int(os.getenv("RAZORPAY_MAX_RETRIES", "3")),
+    )
@@ -0,0 +1,125 @@
+"""Sliding-window quota tracking for per-plan daily download limits.
+
+Each key keeps just two fixed buckets, the current window and the previous
+one, and usage is estimated as
+
+    previous * (1 - elapsed / window) + current
+
+which approximates a true sliding window in O(1) time and memory per user.
+Checking the limit and recording the hit is one atomic step: under a lock in
+process, or in a Lua script when the counters live in Redis so every worker
+enforces the same limit.
+"""
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+
+class QuotaResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: int  # seconds until one more hit would be allowed; 0 when allowed
+
+
+def _estimate(previous: int, current: int, elapsed: float, window: int) -> float:
+    return previous * (1 - elapsed / window) + current
+
+
+def _retry_after(previous: int, current: int, elapsed: float, window: int, limit: int) -> int:
+    """Seconds until the weighted previous bucket decays enough to admit one more hit"""
+    if current + 1 > limit or previous == 0:
+        return int(window - elapsed) + 1
+    # Solve previous * (1 - t / window) + current + 1 <= limit for t
+    needed = window * (1 - (limit - current - 1) / previous)
+    return max(1, int(needed - elapsed) + 1)
+
+
+class InMemoryQuotaBackend:
+    """Per-process counters; stale keys are swept as the table grows"""
+
+    def __init__(self, sweep_threshold: int = 100_000):
+        self._buckets: Dict[str, List[int]] = {}  # key -> [window_index, current, previous]
+        self._lock = threading.Lock()
+        self._sweep_threshold = sweep_threshold
+
+    def _sweep(self, window_index: int) -> None:
+        # Keys untouched for two windows carry no weight any more
+        stale = [key for key, (index, _, _) in self._buckets.items() if index < window_index - 1]
+        for key in stale:
+            del self._buckets[key]
+
+    async def consume(self, key: str, limit: int, window: int, now: float) -> QuotaResult:
+        window_index, elapsed = divmod(now, window)
+        window_index = int(window_index)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None or bucket[0] < window_index - 1:
+                bucket = [window_index, 0, 0]
+            elif bucket[0] == window_index - 1:
+                bucket = [window_index, 0, bucket[1]]
+            _, current, previous = bucket
+
+            allowed = _estimate(previous, current, elapsed, window) + 1 <= limit
+            if allowed:
+                bucket[1] = current = current + 1
+            self._buckets[key] = bucket
+            if len(self._buckets) > self._sweep_threshold:
+                self._sweep(window_index)
+
+        remaining = max(0, int(limit - _estimate(previous, current, elapsed, window)))
+        retry_after = 0 if allowed else _retry_after(previous, current, elapsed, window, limit)
+        return QuotaResult(allowed, limit, remaining, retry_after)
+
+
+# KEYS: current bucket, previous bucket. ARGV: limit, previous weight, ttl.
+_REDIS_CONSUME = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local estimate = previous * tonumber(ARGV[2]) + current
+if estimate + 1 > tonumber(ARGV[1]) then
+    return {0, current, previous}
+end
+current = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return {1, current, previous}
+"""
+
+
+class RedisQuotaBackend:
+    """Counters shared by every worker through Redis (requires the redis package)"""
+
+    def __init__(self, url: str, prefix: str = "quota"):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._script = self._redis.register_script(_REDIS_CONSUME)
+        self._prefix = prefix
+
+    async def consume(self, key: str, limit: int, window: int, now: float) -> QuotaResult:
+        window_index, elapsed = divmod(now, window)
+        window_index = int(window_index)
+        keys = [f"{self._prefix}:{key}:{window_index}", f"{self._prefix}:{key}:{window_index - 1}"]
+        allowed, current, previous = await self._script(
+            keys=keys, args=[limit, 1 - elapsed / window, window * 2]
+        )
+        remaining = max(0, int(limit - _estimate(previous, current, elapsed, window)))
+        retry_after = 0 if allowed else _retry_after(previous, current, elapsed, window, limit)
+        return QuotaResult(bool(allowed), limit, remaining, retry_after)
+
+
+class QuotaTracker:
+    """Sliding-window limits over a pluggable counter backend"""
+
+    def __init__(self, backend=None, window: int = 24 * 60 * 60):
+        self.backend = backend or InMemoryQuotaBackend()
+        self.window = window
+
+    async def consume(self, key: str, limit: int, now: Optional[float] = None) -> QuotaResult:
+        """Record one hit for key if it stays within limit over the trailing window"""
+        return await self.backend.consume(key, limit, self.window, time.time() if now is None else now)
+
+
+def create_tracker(redis_url: Optional[str] = None, window: int = 24 * 60 * 60) -> QuotaTracker:
+    """In-process tracker by default, Redis-backed when a URL is configured"""
+    return QuotaTracker(RedisQuotaBackend(redis_url) if redis_url else None, window=window)
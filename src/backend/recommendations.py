@@ -0,0 +1,243 @@
+"""Item-to-item recommendation index over approved templates.
+
+Each template keeps a precomputed list of its TOP_N most similar templates, so
+a lookup is a list slice. Similarity blends four signals:
+
+    tags         Jaccard overlap of tag sets
+    category     same category
+    text         cosine of TF-IDF vectors over title and description
+    co-purchase  buyers in common, normalized by sqrt(buyers_a * buyers_b)
+
+The index is built in full at startup and then maintained incrementally. Adding
+a template scores it only against the candidates sharing the most tags, strong
+terms and buyers with it, and offers the result to both neighbor lists. A purchase
+re-scores only the pairs it links.
+"""
+import math
+from bisect import insort
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from search_index import tokenize
+
+SIMILARITY_WEIGHTS = {
+    "tags": 0.35,
+    "category": 0.1,
+    "text": 0.3,
+    "copurchase": 0.25,
+}
+TOP_N = 20
+# Strongest TF-IDF terms kept per template, and used to find candidates
+MAX_TERMS = 32
+CANDIDATE_TERMS = 8
+# Postings longer than this are too common to discriminate and are not used to find candidates
+MAX_POSTINGS = 1000
+# Candidates fully scored per template, chosen by how many tags, terms and buyers they share
+MAX_CANDIDATES = 3 * TOP_N
+# Buyers owning more templates than this are skipped as co-purchase signal
+MAX_BASKET = 200
+
+
+class _Features:
+    __slots__ = ("tags", "category", "terms", "vector")
+
+    def __init__(self, tags: Set[str], category: str, terms: Counter):
+        self.tags = tags
+        self.category = category
+        self.terms = terms
+        self.vector: Dict[str, float] = {}
+
+
+class RecommendationIndex:
+    """Top-N neighbor lists for approved templates, updated in place"""
+
+    def __init__(self, top_n: int = TOP_N):
+        self.top_n = top_n
+        self._features: Dict[str, _Features] = {}
+        self._df: Counter = Counter()
+        self._by_tag: Dict[str, Set[str]] = {}
+        self._by_term: Dict[str, Set[str]] = {}
+        self._by_category: Dict[str, Set[str]] = {}
+        self._copurchases: Dict[str, Counter] = {}
+        self._buyers: Counter = Counter()
+        # template id -> [(-score, neighbor id)] ascending, i.e. best first
+        self._neighbors: Dict[str, List[Tuple[float, str]]] = {}
+        self._listed_in: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._features)
+
+    def __contains__(self, template_id: str) -> bool:
+        return template_id in self._features
+
+    def neighbors(self, template_id: str, limit: int = TOP_N) -> List[Tuple[str, float]]:
+        """Most similar templates first, as (template id, score)"""
+        return [(other, -negated) for negated, other in self._neighbors.get(template_id, [])[:limit]]
+
+    # Features
+
+    def _idf(self, term: str) -> float:
+        return math.log((1 + len(self._features)) / (1 + self._df[term])) + 1
+
+    def _vectorize(self, features: _Features) -> None:
+        weights = {term: count * self._idf(term) for term, count in features.terms.items()}
+        strongest = sorted(weights.items(), key=lambda item: item[1], reverse=True)[:MAX_TERMS]
+        norm = math.sqrt(sum(weight * weight for _, weight in strongest)) or 1.0
+        features.vector = {term: weight / norm for term, weight in strongest}
+
+    def _similarity(self, a: str, b: str) -> float:
+        fa, fb = self._features[a], self._features[b]
+        score = 0.0
+        if fa.tags and fb.tags:
+            score += SIMILARITY_WEIGHTS["tags"] * len(fa.tags & fb.tags) / len(fa.tags | fb.tags)
+        if fa.category and fa.category == fb.category:
+            score += SIMILARITY_WEIGHTS["category"]
+        shared = fa.vector.keys() & fb.vector.keys()
+        if shared:
+            score += SIMILARITY_WEIGHTS["text"] * sum(fa.vector[t] * fb.vector[t] for t in shared)
+        together = self._copurchases.get(a, {}).get(b, 0)
+        if together:
+            score += SIMILARITY_WEIGHTS["copurchase"] * together / math.sqrt(self._buyers[a] * self._buyers[b])
+        return score
+
+    def _candidates(self, template_id: str) -> List[str]:
+        """Templates sharing the most tags, strong terms or buyers with this one, before scoring"""
+        features = self._features[template_id]
+        overlap: Counter = Counter(self._copurchases.get(template_id, ()))
+        strongest = sorted(features.vector, key=features.vector.__getitem__, reverse=True)[:CANDIDATE_TERMS]
+        for index, keys in ((self._by_tag, features.tags), (self._by_term, strongest)):
+            for key in keys:
+                postings = index.get(key, ())
+                if len(postings) <= MAX_POSTINGS:
+                    overlap.update(postings)
+        overlap.pop(template_id, None)
+        if len(overlap) < self.top_n:
+            # Sparse features: fall back to a bounded slice of the same category
+            for other in self._by_category.get(features.category, ()):
+                if other != template_id:
+                    overlap.setdefault(other, 0)
+                if len(overlap) >= MAX_CANDIDATES:
+                    break
+        return [other for other, _ in overlap.most_common(MAX_CANDIDATES) if other in self._features]
+
+    # Neighbor lists
+
+    def _offer(self, template_id: str, other: str, score: float) -> None:
+        """Place other in template_id's list at score, or drop it if it no longer ranks"""
+        entries = self._neighbors.setdefault(template_id, [])
+        listed_in = self._listed_in.get(other)
+        if listed_in is not None and template_id in listed_in:
+            for position, (_, existing) in enumerate(entries):
+                if existing == other:
+                    del entries[position]
+                    break
+            listed_in.discard(template_id)
+        if score <= 0 or (len(entries) >= self.top_n and -score >= entries[-1][0]):
+            return
+        insort(entries, (-score, other))
+        self._listed_in.setdefault(other, set()).add(template_id)
+        if len(entries) > self.top_n:
+            _, evicted = entries.pop()
+            self._listed_in[evicted].discard(template_id)
+
+    def _rescore(self, a: str, b: str) -> None:
+        score = self._similarity(a, b)
+        self._offer(a, b, score)
+        self._offer(b, a, score)
+
+    # Updates
+
+    def _index(self, template: Any) -> None:
+        features = self._features[template.id]
+        for tag in features.tags:
+            self._by_tag.setdefault(tag, set()).add(template.id)
+        for term in features.vector:
+            self._by_term.setdefault(term, set()).add(template.id)
+        self._by_category.setdefault(features.category, set()).add(template.id)
+
+    def _unindex(self, template_id: str) -> None:
+        features = self._features[template_id]
+        for index, keys in ((self._by_tag, features.tags), (self._by_term, features.vector),
+                            (self._by_category, [features.category])):
+            for key in keys:
+                postings = index.get(key)
+                if postings is not None:
+                    postings.discard(template_id)
+                    if not postings:
+                        del index[key]
+
+    def _prepare(self, template: Any) -> None:
+        features = _Features(
+            tags={tag.lower() for tag in template.tags or []},
+            category=(template.category or "").lower(),
+            terms=Counter(tokenize(template.title) + tokenize(template.description))
+        )
+        self._features[template.id] = features
+        self._df.update(features.terms.keys())
+
+    def add(self, template: Any) -> None:
+        """Index or re-index an approved template and link it to its neighbors"""
+        if template.id in self._features:
+            self.remove(template.id)
+        self._prepare(template)
+        self._vectorize(self._features[template.id])
+        self._index(template)
+        self._link(template.id)
+
+    def _link(self, template_id: str) -> None:
+        for other in self._candidates(template_id):
+            self._rescore(template_id, other)
+
+    def remove(self, template_id: str) -> None:
+        """Drop a template, e.g. when it is no longer approved"""
+        features = self._features.get(template_id)
+        if features is None:
+            return
+        self._unindex(template_id)
+        self._df.subtract(features.terms.keys())
+        del self._features[template_id]
+        for holder in self._listed_in.pop(template_id, set()):
+            self._neighbors[holder] = [entry for entry in self._neighbors[holder] if entry[1] != template_id]
+        for _, other in self._neighbors.pop(template_id, []):
+            self._listed_in.get(other, set()).discard(template_id)
+
+    def record_purchase(self, template_id: str, owned: Iterable[str]) -> None:
+        """Count a buyer's first purchase of a template against the other templates they own"""
+        self._buyers[template_id] += 1
+        owned = [other for other in owned if other != template_id]
+        if len(owned) > MAX_BASKET:
+            return
+        for other in owned:
+            self._copurchases.setdefault(template_id, Counter())[other] += 1
+            self._copurchases.setdefault(other, Counter())[template_id] += 1
+        if template_id not in self._features:
+            return
+        for other in owned:
+            if other in self._features:
+                self._rescore(template_id, other)
+
+    @classmethod
+    def build(cls, templates: Iterable[Any], baskets: Iterable[Iterable[str]], top_n: int = TOP_N) -> "RecommendationIndex":
+        """Build the full index from approved templates and each buyer's purchased template ids"""
+        index = cls(top_n)
+        for basket in baskets:
+            basket = list(basket)
+            for template_id in basket:
+                index._buyers[template_id] += 1
+            if len(basket) > MAX_BASKET:
+                continue
+            for template_id in basket:
+                counts = index._copurchases.setdefault(template_id, Counter())
+                for other in basket:
+                    if other != template_id:
+                        counts[other] += 1
+        templates = list(templates)
+        # Document frequencies first, so every vector uses the final IDF
+        for template in templates:
+            index._prepare(template)
+        for template in templates:
+            index._vectorize(index._features[template.id])
+            index._index(template)
+        for template in templates:
+            index._link(template.id)
+        return index
@@ -0,0 +1,132 @@
+"""Compact in-memory record helpers.
+
+User and Template instances use __slots__, so a worker holding millions of
+them pays no per-instance __dict__. Low-cardinality strings (categories, user
+types, plans) are interned so every record shares one copy, and template status
+is stored as a small integer code. The numeric catalog fields are mirrored
+into CatalogColumns, parallel numpy arrays with one row per template, so
+ranking and filtering can run as vectorized passes instead of attribute
+lookups on each object.
+"""
+import sys
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+TEMPLATE_STATUSES = ("pending", "approved", "rejected")
+STATUS_CODES = {status: code for code, status in enumerate(TEMPLATE_STATUSES)}
+
+
+class InternedField:
+    """Slot-backed attribute that interns the strings assigned to it"""
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.slot = f"_{name}"
+
+    def __get__(self, obj: Any, owner: type = None) -> Any:
+        return self if obj is None else getattr(obj, self.slot)
+
+    def __set__(self, obj: Any, value: Any) -> None:
+        setattr(obj, self.slot, sys.intern(value) if isinstance(value, str) else value)
+
+
+class CodedField:
+    """Slot-backed attribute storing one of a fixed set of strings as its integer code"""
+
+    def __init__(self, choices: Sequence[str]):
+        self.choices = tuple(choices)
+        self.codes = {choice: code for code, choice in enumerate(self.choices)}
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.slot = f"_{name}"
+
+    def __get__(self, obj: Any, owner: type = None) -> Any:
+        return self if obj is None else self.choices[getattr(obj, self.slot)]
+
+    def __set__(self, obj: Any, value: str) -> None:
+        try:
+            setattr(obj, self.slot, self.codes[value])
+        except KeyError:
+            raise ValueError(f"Invalid value {value!r}; expected one of {', '.join(self.choices)}") from None
+
+
+def intern_all(values: Sequence[str]) -> List[str]:
+    """List of interned copies, for tag lists shared across many records"""
+    return [sys.intern(value) for value in values] if values else []
+
+
+# Column name -> dtype; created_at is a POSIX timestamp and status a STATUS_CODES value
+CATALOG_COLUMNS = {
+    "price": np.int64,
+    "downloads": np.int64,
+    "views": np.int64,
+    "sales": np.int64,
+    "rating": np.float32,
+    "reviews_count": np.int64,
+    "created_at": np.float64,
+    "status": np.int8,
+    "is_free": np.bool_,
+    "is_trending": np.bool_,
+    "is_featured": np.bool_,
+}
+
+
+def _column_value(template: Any, name: str) -> Any:
+    if name == "created_at":
+        return template.created_at.timestamp()
+    if name == "status":
+        return STATUS_CODES[template.status]
+    return getattr(template, name)
+
+
+class CatalogColumns:
+    """Numeric template fields in growable parallel arrays, one row per template.
+
+    Rows are assigned in insertion order and never reused; the repository calls
+    set() whenever a template is filed, so the arrays always match the objects.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._arrays = {name: np.zeros(capacity, dtype) for name, dtype in CATALOG_COLUMNS.items()}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Live view of one column over the filled rows"""
+        return self._arrays[name][:len(self.ids)]
+
+    def _grow(self) -> None:
+        capacity = len(next(iter(self._arrays.values()))) * 2
+        for name, array in self._arrays.items():
+            grown = np.zeros(capacity, array.dtype)
+            grown[:len(array)] = array
+            self._arrays[name] = grown
+
+    def row(self, template_id: str) -> int:
+        return self._rows[template_id]
+
+    def set(self, template: Any) -> None:
+        """Write a template's current values into its row, appending a row for a new one"""
+        row = self._rows.get(template.id)
+        if row is None:
+            row = len(self.ids)
+            if row == len(self._arrays["price"]):
+                self._grow()
+            self._rows[template.id] = row
+            self.ids.append(template.id)
+        for name, array in self._arrays.items():
+            array[row] = _column_value(template, name)
+
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        """Copies of every column, safe to use while the live arrays keep changing"""
+        return {name: array[:len(self.ids)].copy() for name, array in self._arrays.items()}
+
+    def ids_where(self, mask: np.ndarray) -> List[str]:
+        """Template ids of the rows selected by a boolean mask"""
+        return [self.ids[row] for row in np.flatnonzero(mask)]
+
+    def approved(self) -> np.ndarray:
+        return self["status"] == STATUS_CODES["approved"]
@@ -0,0 +1,564 @@
+"""In-memory repositories that own the user, template, review, purchase and subscription collections.
+
+Each repository keeps hash indexes next to the primary id map and updates them
+on every insert and update, so lookups by email, mobile, seller, category or
+status never scan the whole collection.
+"""
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+from records import CatalogColumns
+from search_index import SearchIndex
+
+
+def _normalize_email(email: Optional[str]) -> Optional[str]:
+    return email.strip().lower() if email else None
+
+
+def _normalize_key(value: Optional[str]) -> Optional[str]:
+    return value.lower() if value else None
+
+
+class UserRepository:
+    """Users indexed by id, email and mobile, with a running count per user type"""
+
+    def __init__(self):
+        self._by_id: Dict[str, Any] = {}
+        self._by_email: Dict[str, Any] = {}
+        self._by_mobile: Dict[str, Any] = {}
+        self._type_counts: Dict[str, int] = {}
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._by_id.values())
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def add(self, user: Any) -> Any:
+        """Insert a new user; email and mobile must be unique"""
+        email = _normalize_email(user.email)
+        if email in self._by_email:
+            raise ValueError("User already exists")
+        if user.mobile and user.mobile in self._by_mobile:
+            raise ValueError("Mobile number already registered")
+        self._by_id[user.id] = user
+        self._by_email[email] = user
+        if user.mobile:
+            self._by_mobile[user.mobile] = user
+        self._type_counts[user.user_type] = self._type_counts.get(user.user_type, 0) + 1
+        return user
+
+    def update(self, user: Any, **fields) -> Any:
+        """Set attributes on a stored user and keep the email/mobile indexes current"""
+        old_email = _normalize_email(user.email)
+        old_mobile = user.mobile
+        old_type = user.user_type
+        for key, value in fields.items():
+            setattr(user, key, value)
+
+        if user.user_type != old_type:
+            self._type_counts[old_type] -= 1
+            self._type_counts[user.user_type] = self._type_counts.get(user.user_type, 0) + 1
+
+        new_email = _normalize_email(user.email)
+        if new_email != old_email:
+            self._by_email.pop(old_email, None)
+            self._by_email[new_email] = user
+        if user.mobile != old_mobile:
+            if old_mobile:
+                self._by_mobile.pop(old_mobile, None)
+            if user.mobile:
+                self._by_mobile[user.mobile] = user
+        return user
+
+    def get(self, user_id: str) -> Optional[Any]:
+        return self._by_id.get(user_id)
+
+    def count_by_type(self, user_type: str) -> int:
+        return self._type_counts.get(user_type, 0)
+
+    def get_by_email(self, email: str) -> Optional[Any]:
+        return self._by_email.get(_normalize_email(email))
+
+    def get_by_mobile(self, mobile: str) -> Optional[Any]:
+        return self._by_mobile.get(mobile)
+
+    def get_by_login(self, email_or_mobile: str) -> Optional[Any]:
+        """Resolve a login identifier that may be either an email or a mobile number"""
+        return self.get_by_email(email_or_mobile) or self.get_by_mobile(email_or_mobile)
+
+
+class ReviewRepository:
+    """Reviews indexed by id and by template, in insertion order"""
+
+    def __init__(self):
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_template: Dict[str, List[Dict[str, Any]]] = {}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._by_id.values())
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def add(self, review: Dict[str, Any]) -> Dict[str, Any]:
+        self._by_id[review["id"]] = review
+        self._by_template.setdefault(review["template_id"], []).append(review)
+        return review
+
+    def get(self, review_id: str) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(review_id)
+
+    def for_template(self, template_id: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """A page of a template's reviews, most recently added first"""
+        reviews = self._by_template.get(template_id, [])
+        end = len(reviews) - offset
+        return reviews[max(end - limit, 0):max(end, 0)][::-1]
+
+    def count_for_template(self, template_id: str) -> int:
+        return len(self._by_template.get(template_id, []))
+
+
+class PurchaseRepository:
+    """Purchases indexed by id, payment id, template, seller and buyer, in insertion order.
+
+    A time index of (created_at, id) keys, overall and per seller, serves date
+    range scans without touching purchases outside the range. The sum of all
+    purchase amounts is kept as a running total.
+    """
+
+    def __init__(self):
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_payment_id: Dict[str, Dict[str, Any]] = {}
+        self._by_template: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_seller: Dict[str, List[Dict[str, Any]]] = {}
+        self._owned: Dict[str, Set[str]] = {}  # buyer id -> purchased template ids
+        # Sorted (created_at, id) keys; purchases mostly arrive in time order, so inserts are appends
+        self._timeline: List[Tuple[Any, str]] = []
+        self._seller_timelines: Dict[str, List[Tuple[Any, str]]] = {}
+        self.total_revenue = 0
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._by_id.values())
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    @staticmethod
+    def _insert_key(timeline: List[Tuple[Any, str]], key: Tuple[Any, str]) -> None:
+        if not timeline or key >= timeline[-1]:
+            timeline.append(key)
+        else:
+            insort(timeline, key)
+
+    def add(self, purchase: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a purchase; a payment id can only be recorded once"""
+        return self._add(purchase, self._insert_key)
+
+    def _add(self, purchase: Dict[str, Any], insert_key: Callable[[List[Tuple[Any, str]], Tuple[Any, str]], None]):
+        payment_id = purchase.get("payment_id")
+        if payment_id and payment_id in self._by_payment_id:
+            raise ValueError("Payment already recorded")
+        self._by_id[purchase["id"]] = purchase
+        if payment_id:
+            self._by_payment_id[payment_id] = purchase
+        self._by_template.setdefault(purchase["template_id"], []).append(purchase)
+        self._by_seller.setdefault(purchase["seller_id"], []).append(purchase)
+        self._owned.setdefault(purchase["user_id"], set()).add(purchase["template_id"])
+        key = (purchase["created_at"], purchase["id"])
+        insert_key(self._timeline, key)
+        insert_key(self._seller_timelines.setdefault(purchase["seller_id"], []), key)
+        self.total_revenue += purchase.get("amount", 0)
+        return purchase
+
+    def extend(self, purchases: Iterable[Dict[str, Any]]) -> None:
+        """Bulk insert in any time order: keys are appended, then each timeline is sorted once"""
+        touched: Set[str] = set()
+        for purchase in purchases:
+            self._add(purchase, list.append)
+            touched.add(purchase["seller_id"])
+        self._timeline.sort()
+        for seller_id in touched:
+            self._seller_timelines[seller_id].sort()
+
+    def get(self, purchase_id: str) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(purchase_id)
+
+    def get_by_payment_id(self, payment_id: str) -> Optional[Dict[str, Any]]:
+        return self._by_payment_id.get(payment_id)
+
+    def for_template(self, template_id: str) -> List[Dict[str, Any]]:
+        return list(self._by_template.get(template_id, []))
+
+    def for_seller(self, seller_id: str) -> List[Dict[str, Any]]:
+        return list(self._by_seller.get(seller_id, []))
+
+    def sellers(self) -> List[str]:
+        """Ids of sellers with at least one purchase, sorted"""
+        return sorted(self._seller_timelines)
+
+    def between(self, start: Optional[Any] = None, end: Optional[Any] = None, seller_id: Optional[str] = None,
+                batch_size: int = 500) -> Iterator[List[Dict[str, Any]]]:
+        """Purchases created in [start, end), oldest first, in batches.
+
+        The position is re-found from the last key after every batch, so the
+        stores can change between batches without rows being skipped or repeated.
+        """
+        timeline = self._timeline if seller_id is None else self._seller_timelines.get(seller_id, [])
+        position = bisect_left(timeline, (start,)) if start is not None else 0
+        while True:
+            keys = timeline[position:position + batch_size]
+            if end is not None and keys and keys[-1][0] >= end:
+                keys = keys[:bisect_left(keys, (end,))]
+            if not keys:
+                return
+            yield [self._by_id[purchase_id] for _, purchase_id in keys]
+            if len(keys) < batch_size:
+                return
+            position = bisect_right(timeline, keys[-1])
+
+    def has_purchased(self, user_id: str, template_id: str) -> bool:
+        return template_id in self._owned.get(user_id, ())
+
+    def owned_by(self, user_id: str) -> FrozenSet[str]:
+        return frozenset(self._owned.get(user_id, ()))
+
+    def baskets(self) -> Iterator[Set[str]]:
+        """Template ids purchased by each buyer"""
+        return iter(self._owned.values())
+
+
+class SubscriptionRepository:
+    """Subscription activations indexed by payment id and user, in insertion order.
+
+    The sum of all subscription payments is kept as a running total.
+    """
+
+    def __init__(self):
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_payment_id: Dict[str, Dict[str, Any]] = {}
+        self._by_user: Dict[str, List[Dict[str, Any]]] = {}
+        self.total_revenue = 0
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._by_id.values())
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def add(self, subscription: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert an activation; a payment id can only be recorded once"""
+        payment_id = subscription.get("payment_id")
+        if payment_id and payment_id in self._by_payment_id:
+            raise ValueError("Payment already recorded")
+        self._by_id[subscription["id"]] = subscription
+        if payment_id:
+            self._by_payment_id[payment_id] = subscription
+        self._by_user.setdefault(subscription["user_id"], []).append(subscription)
+        self.total_revenue += subscription.get("amount", 0)
+        return subscription
+
+    def get(self, subscription_id: str) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(subscription_id)
+
+    def get_by_payment_id(self, payment_id: str) -> Optional[Dict[str, Any]]:
+        return self._by_payment_id.get(payment_id)
+
+    def for_user(self, user_id: str) -> List[Dict[str, Any]]:
+        return list(self._by_user.get(user_id, []))
+
+
+# Sort orders of the public listing. Keys sort ascending, so values are negated
+# to list newest / most downloaded / best rated first; the id breaks ties.
+SORT_ORDERS = {
+    "created_at": lambda t: -t.created_at.timestamp(),
+    "downloads": lambda t: -t.downloads,
+    "rating": lambda t: -t.rating,
+}
+
+# Orders awaiting payment kept in memory at most
+PENDING_ORDERS_LIMIT = 100_000
+
+# Template counters rolled up into per-seller totals
+SELLER_TOTALS = ("earnings", "sales", "downloads", "views")
+
+# Bound on cached filtered listings (one per facet combination and sort order)
+LISTING_CACHE_SIZE = 256
+
+
+def _listing_facets(template: Any) -> FrozenSet[Tuple[str, Any]]:
+    """Facets under which an approved template appears in the public listing"""
+    if template.status != "approved":
+        return frozenset()
+    facets = {("category", _normalize_key(template.category)), ("is_free", bool(template.is_free))}
+    if template.is_trending:
+        facets.add(("is_trending", True))
+    return frozenset(facets)
+
+
+def _listing_order_keys(template: Any) -> Dict[str, Tuple[Any, str]]:
+    if template.status != "approved":
+        return {}
+    return {name: (key(template), template.id) for name, key in SORT_ORDERS.items()}
+
+
+class OrderRepository:
+    """Checkout orders awaiting payment, by Razorpay order id.
+
+    Orders are also written to the database, which lookups fall back to, so
+    memory only holds recent ones: an order is dropped once its payment is
+    recorded, and beyond max_entries the oldest abandoned orders are evicted.
+    """
+
+    def __init__(self, max_entries: int = PENDING_ORDERS_LIMIT):
+        self.max_entries = max_entries
+        self._by_id: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def add(self, order: Dict[str, Any]) -> Dict[str, Any]:
+        self._by_id[order["id"]] = order
+        while len(self._by_id) > self.max_entries:
+            self._by_id.popitem(last=False)
+        return order
+
+    def get(self, order_id: str) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(order_id)
+
+    def discard(self, order_id: Optional[str]) -> None:
+        self._by_id.pop(order_id, None)
+
+
+class TemplateRepository:
+    """Templates indexed by id, seller, category and status, plus the search index.
+
+    Approved templates are additionally filed under listing facets (category,
+    is_free, is_trending) and kept in one sorted key list per sort order, so the
+    public catalog is served by set intersection and bisection instead of scans.
+    Per-seller totals of the SELLER_TOTALS counters are adjusted by the delta of
+    every update, so seller dashboards never sum over templates or purchases.
+    The numeric fields are mirrored into ``columns`` for vectorized passes.
+    """
+
+    def __init__(self):
+        self._by_id: Dict[str, Any] = {}
+        # Dicts keyed by template id double as insertion-ordered sets
+        self._by_seller: Dict[str, Dict[str, Any]] = {}
+        self._by_category: Dict[str, Dict[str, Any]] = {}
+        self._by_status: Dict[str, Dict[str, Any]] = {}
+        self._by_facet: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+        self._orders: Dict[str, List[Tuple[Any, str]]] = {name: [] for name in SORT_ORDERS}
+        # Keys each template is currently filed under, so updates can unfile it
+        self._filed: Dict[str, Dict[str, Any]] = {}
+        self._seller_totals: Dict[str, Dict[str, float]] = {}
+        self._facet_version = 0
+        # Per sort order, so a download count change leaves cached created_at orderings valid
+        self._order_versions: Dict[str, int] = {name: 0 for name in SORT_ORDERS}
+        self._listing_cache: Dict[Tuple, Tuple[Tuple[int, int], List[Tuple[Any, str]]]] = {}
+        self._count_cache: Dict[FrozenSet, Tuple[int, int]] = {}
+        self.search_index = SearchIndex()
+        self.columns = CatalogColumns()
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._by_id.values())
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    @staticmethod
+    def _link(index: Dict[Any, Dict[str, Any]], key: Any, template: Any) -> None:
+        index.setdefault(key, {})[template.id] = template
+
+    @staticmethod
+    def _unlink(index: Dict[Any, Dict[str, Any]], key: Any, template_id: str) -> None:
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(template_id, None)
+            if not bucket:
+                del index[key]
+
+    def _file(self, template: Any) -> None:
+        """Move a template between index buckets to match its current attributes"""
+        old = self._filed.get(template.id, {})
+        new = {
+            "user_id": template.user_id,
+            "category": _normalize_key(template.category),
+            "status": template.status,
+            "facets": _listing_facets(template),
+            "orders": _listing_order_keys(template),
+            "totals": {name: getattr(template, name) for name in SELLER_TOTALS},
+            "version": old.get("version", 0) + 1,
+        }
+
+        for attr, index in (
+            ("user_id", self._by_seller),
+            ("category", self._by_category),
+            ("status", self._by_status),
+        ):
+            if attr not in old or old[attr] != new[attr]:
+                if attr in old:
+                    self._unlink(index, old[attr], template.id)
+                self._link(index, new[attr], template)
+
+        old_facets = old.get("facets", frozenset())
+        if old_facets != new["facets"]:
+            for facet in old_facets - new["facets"]:
+                self._unlink(self._by_facet, facet, template.id)
+            for facet in new["facets"] - old_facets:
+                self._link(self._by_facet, facet, template)
+            self._facet_version += 1
+
+        old_orders = old.get("orders", {})
+        if old_orders != new["orders"]:
+            for name, keys in self._orders.items():
+                old_key, new_key = old_orders.get(name), new["orders"].get(name)
+                if old_key == new_key:
+                    continue
+                if old_key is not None:
+                    del keys[bisect_left(keys, old_key)]
+                if new_key is not None:
+                    insort(keys, new_key)
+                self._order_versions[name] += 1
+
+        old_totals = old.get("totals")
+        if old_totals is not None and old["user_id"] != new["user_id"]:
+            self._add_seller_totals(old["user_id"], old_totals, sign=-1)
+            old_totals = None
+        if old_totals != new["totals"]:
+            deltas = {name: new["totals"][name] - (old_totals or {}).get(name, 0) for name in SELLER_TOTALS}
+            self._add_seller_totals(new["user_id"], deltas)
+
+        self._filed[template.id] = new
+        self.columns.set(template)
+
+    def _add_seller_totals(self, seller_id: str, amounts: Dict[str, float], sign: int = 1) -> None:
+        totals = self._seller_totals.setdefault(seller_id, {name: 0 for name in SELLER_TOTALS})
+        for name in SELLER_TOTALS:
+            totals[name] += sign * amounts[name]
+
+    def add(self, template: Any) -> Any:
+        """Insert a new template into every index"""
+        if template.id in self._by_id:
+            raise ValueError("Template already exists")
+        self._by_id[template.id] = template
+        self._file(template)
+        self.search_index.add(template)
+        return template
+
+    def update(self, template: Any, **fields) -> Any:
+        """Set attributes on a stored template and re-index whatever they affect"""
+        for key, value in fields.items():
+            setattr(template, key, value)
+        self._file(template)
+        if fields.keys() & {"title", "description", "tags"}:
+            self.search_index.update(template)
+        return template
+
+    def get(self, template_id: str) -> Optional[Any]:
+        return self._by_id.get(template_id)
+
+    def version(self, template_id: str) -> int:
+        """Counter bumped on every add or update of a template, for caches derived from it"""
+        return self._filed[template_id]["version"]
+
+    def by_seller(self, seller_id: str) -> List[Any]:
+        return list(self._by_seller.get(seller_id, {}).values())
+
+    def seller_totals(self, seller_id: str) -> Dict[str, float]:
+        """Earnings, sales, downloads and views summed over a seller's templates"""
+        return dict(self._seller_totals.get(seller_id, {name: 0 for name in SELLER_TOTALS}))
+
+    def by_category(self, category: str) -> List[Any]:
+        return list(self._by_category.get(_normalize_key(category), {}).values())
+
+    def by_status(self, status: str) -> List[Any]:
+        return list(self._by_status.get(status, {}).values())
+
+    def count_by_status(self, status: str) -> int:
+        return len(self._by_status.get(status, {}))
+
+    def search(self, query: str) -> List[Any]:
+        """Templates matching a free-text query, best match first"""
+        return self.search_index.search(query)
+
+    # Public listing
+
+    @staticmethod
+    def listing_facets(
+        category: Optional[str] = None,
+        is_free: Optional[bool] = None,
+        is_trending: Optional[bool] = None,
+    ) -> FrozenSet[Tuple[str, Any]]:
+        """Translate listing filters into the facet keys they select"""
+        facets = set()
+        if category:
+            facets.add(("category", _normalize_key(category)))
+        if is_free is not None:
+            facets.add(("is_free", is_free))
+        if is_trending:
+            facets.add(("is_trending", True))
+        return frozenset(facets)
+
+    def _facet_members(self, facets: FrozenSet[Tuple[str, Any]]) -> Dict[str, Any]:
+        """Approved templates carrying every facet, intersecting from the smallest set"""
+        if not facets:
+            return self._by_status.get("approved", {})
+        buckets = sorted((self._by_facet.get(f, {}) for f in facets), key=len)
+        smallest, rest = buckets[0], buckets[1:]
+        if not rest:
+            return smallest
+        return {tid: t for tid, t in smallest.items() if all(tid in b for b in rest)}
+
+    def in_listing(self, template: Any, facets: FrozenSet[Tuple[str, Any]]) -> bool:
+        """Whether an approved template carries every facet"""
+        return template.status == "approved" and facets <= self._filed[template.id]["facets"]
+
+    def count_listing(self, facets: FrozenSet[Tuple[str, Any]]) -> int:
+        """Number of approved templates carrying every facet, cached until membership changes"""
+        cached = self._count_cache.get(facets)
+        if cached and cached[0] == self._facet_version:
+            return cached[1]
+        count = len(self._facet_members(facets))
+        if len(self._count_cache) >= LISTING_CACHE_SIZE:
+            self._count_cache.clear()
+        self._count_cache[facets] = (self._facet_version, count)
+        return count
+
+    def _ordered_keys(self, facets: FrozenSet[Tuple[str, Any]], sort: str) -> List[Tuple[Any, str]]:
+        """Sorted listing keys for a facet combination, rebuilt only after writes"""
+        if not facets:
+            return self._orders[sort]
+        version = (self._facet_version, self._order_versions[sort])
+        cached = self._listing_cache.get((facets, sort))
+        if cached and cached[0] == version:
+            return cached[1]
+        keys = sorted(self._filed[tid]["orders"][sort] for tid in self._facet_members(facets))
+        if len(self._listing_cache) >= LISTING_CACHE_SIZE:
+            self._listing_cache.clear()
+        self._listing_cache[(facets, sort)] = (version, keys)
+        return keys
+
+    def sort_key(self, template: Any, sort: str) -> Tuple[Any, str]:
+        return (SORT_ORDERS[sort](template), template.id)
+
+    def list_page(
+        self,
+        facets: FrozenSet[Tuple[str, Any]],
+        sort: str = "created_at",
+        after: Optional[Tuple[Any, str]] = None,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> Tuple[List[Any], Optional[Tuple[Any, str]]]:
+        """One page of the approved listing in sort order.
+
+        Pages start just past the ``after`` key when given (cursor pagination),
+        otherwise at ``offset``. Returns the templates and the key to resume
+        from, or None on the last page.
+        """
+        keys = self._ordered_keys(facets, sort)
+        start = bisect_right(keys, after) if after is not None else offset
+        page = keys[start:start + limit]
+        next_key = page[-1] if page and start + limit < len(keys) else None
+        return [self._by_id[tid] for _, tid in page], next_key
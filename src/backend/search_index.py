@@ -0,0 +1,132 @@
+"""Inverted full-text index over the template catalog.
+
+Titles, tags and descriptions are tokenized once when a template is indexed.
+Queries expand each term to every indexed token it prefixes and only touch the
+postings of those tokens, so a search costs time proportional to the matching
+postings rather than the size of the catalog.
+"""
+import re
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+# Relevance weight of a hit in each field
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "tags": 2.0,
+    "description": 1.0,
+}
+# Extra weight when a query term matches a whole token rather than a prefix
+EXACT_MATCH_BONUS = 0.5
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase alphanumeric tokens"""
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def _field_tokens(template: Any) -> Dict[str, float]:
+    """Map every token of a template to the weight of its best field"""
+    weights: Dict[str, float] = {}
+    fields = (
+        ("description", [template.description]),
+        ("tags", template.tags or []),
+        ("title", [template.title]),
+    )
+    for field, values in fields:
+        for value in values:
+            for token in tokenize(value):
+                weights[token] = max(weights.get(token, 0.0), FIELD_WEIGHTS[field])
+    return weights
+
+
+class SearchIndex:
+    """Token -> {template_id: weight} postings with a sorted vocabulary for prefix lookups"""
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._vocabulary: List[str] = []
+        self._doc_tokens: Dict[str, Dict[str, float]] = {}
+        self._documents: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_tokens)
+
+    def add(self, template: Any) -> None:
+        """Index a template, replacing any previous entry for the same id"""
+        if template.id in self._doc_tokens:
+            self.remove(template.id)
+        weights = _field_tokens(template)
+        self._doc_tokens[template.id] = weights
+        self._documents[template.id] = template
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                insort(self._vocabulary, token)
+            postings[template.id] = weight
+
+    def update(self, template: Any) -> None:
+        """Re-index a template after its title, description or tags changed"""
+        self.add(template)
+
+    def remove(self, template_id: str) -> None:
+        """Drop a template from the index"""
+        self._documents.pop(template_id, None)
+        weights = self._doc_tokens.pop(template_id, None)
+        if not weights:
+            return
+        for token in weights:
+            postings = self._postings[token]
+            postings.pop(template_id, None)
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+
+    def _expand(self, term: str) -> Iterable[str]:
+        """Yield every indexed token that starts with term"""
+        position = bisect_left(self._vocabulary, term)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(term):
+            yield self._vocabulary[position]
+            position += 1
+
+    def _term_scores(self, term: str) -> Dict[str, float]:
+        """Best score of each template matching a single query term"""
+        scores: Dict[str, float] = {}
+        for token in self._expand(term):
+            bonus = EXACT_MATCH_BONUS if token == term else 0.0
+            for template_id, weight in self._postings[token].items():
+                score = weight + bonus
+                if score > scores.get(template_id, 0.0):
+                    scores[template_id] = score
+        return scores
+
+    def search_ids(self, query: str, candidates: Optional[Set[str]] = None) -> List[str]:
+        """Return ids of templates matching every query term, best match first"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        # Intersect starting from the term with the fewest matching templates
+        per_term = sorted((self._term_scores(term) for term in terms), key=len)
+        scores = dict(per_term[0])
+        if candidates is not None:
+            scores = {tid: s for tid, s in scores.items() if tid in candidates}
+        for term_scores in per_term[1:]:
+            if not scores:
+                break
+            scores = {tid: s + term_scores[tid] for tid, s in scores.items() if tid in term_scores}
+
+        return sorted(scores, key=scores.__getitem__, reverse=True)
+
+    def matches(self, template_id: str, query: str) -> bool:
+        """Whether an indexed template matches every query term, without touching postings"""
+        tokens = self._doc_tokens.get(template_id)
+        if not tokens:
+            return False
+        return all(any(token.startswith(term) for token in tokens) for term in tokenize(query))
+
+    def search(self, query: str, candidates: Optional[Set[str]] = None) -> List[Any]:
+        """Return templates matching every query term, best match first"""
+        return [self._documents[tid] for tid in self.search_ids(query, candidates)]
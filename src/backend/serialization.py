@@ -0,0 +1,78 @@
+"""Fast JSON encoding for the catalog and dashboard endpoints.
+
+Responses are assembled from pre-encoded pieces instead of going through
+FastAPI's jsonable_encoder. Each template card is encoded once and reused until
+the template's repository version changes. A page is the card bytes joined
+into one JSON document, or streamed in chunks when it is large. orjson is used
+when installed; otherwise the standard library encoder is used.
+"""
+import json
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Sequence, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+# Cards encoded per chunk when a page is streamed
+STREAM_CHUNK_ITEMS = 100
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON; datetimes become ISO 8601 strings"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=_default).encode()
+
+
+def _head(fields: Dict[str, Any], list_key: str) -> bytes:
+    """Opening of an object holding fields, followed by the start of the list_key array"""
+    encoded = dumps(fields)
+    separator = b"," if fields else b""
+    return encoded[:-1] + separator + dumps(list_key) + b":["
+
+
+def encode_page(fields: Dict[str, Any], list_key: str, items: Sequence[bytes]) -> bytes:
+    """One JSON object of fields plus an array of already-encoded items"""
+    return _head(fields, list_key) + b",".join(items) + b"]}"
+
+
+def stream_page(fields: Dict[str, Any], list_key: str, items: Sequence[Any],
+                encode: Callable[[Any], bytes]) -> Iterator[bytes]:
+    """encode_page as chunks, encoding items lazily so the first bytes go out immediately"""
+    yield _head(fields, list_key)
+    for start in range(0, len(items), STREAM_CHUNK_ITEMS):
+        chunk = b",".join(encode(item) for item in items[start:start + STREAM_CHUNK_ITEMS])
+        yield (b"," + chunk) if start else chunk
+    yield b"]}"
+
+
+class CardCache:
+    """Encoded JSON per (kind, template, variant), valid while the template version is unchanged"""
+
+    def __init__(self, max_entries: int = 200_000):
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[str, str, Hashable], Tuple[int, bytes]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, kind: str, template_id: str, version: int, render: Callable[[], Dict[str, Any]],
+            variant: Optional[Hashable] = None) -> bytes:
+        key = (kind, template_id, variant)
+        cached = self._entries.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        encoded = dumps(render())
+        if cached is None and len(self._entries) >= self.max_entries:
+            # Evict the oldest insertion; dicts keep insertion order
+            del self._entries[next(iter(self._entries))]
+        self._entries[key] = (version, encoded)
+        return encoded
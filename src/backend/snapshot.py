@@ -0,0 +1,154 @@
+"""Catalog snapshots for fast worker startup.
+
+Hydrating from the database means re-running every repository insert: the
+search index, facet and sort indexes, seller totals and the recommendation
+index are all rebuilt row by row, which takes minutes for a large catalog.
+A snapshot stores the already-built repositories instead. It is one file:
+
+    MAGIC | header length (8 bytes, little endian) | JSON header | sections
+
+The header records when the snapshot was taken and the offset and length of
+each section, a pickled object. Readers map the file read-only and decode
+sections straight out of the mapping, so workers starting together share the
+file's pages through the page cache rather than each reading it into a
+private buffer, and peak memory during startup is one section's objects plus
+the mapping.
+
+Writing forks the process: the child pickles its copy-on-write view of the
+stores and exits, so the serving process keeps answering requests. Files
+are replaced atomically and only the process holding the writer lock writes.
+"""
+import json
+import mmap
+import os
+import pickle
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+MAGIC = b"CELORA-SNAPSHOT\0"
+# Bumped whenever the file layout or a snapshotted store changes shape
+FORMAT_VERSION = 3
+_LENGTH_BYTES = 8
+
+
+class SnapshotError(Exception):
+    """The file is not a snapshot this version can read"""
+
+
+def write_snapshot(path: str, sections: Dict[str, Any], taken_at: datetime) -> int:
+    """Write sections to path atomically; returns the file size"""
+    encoded = {name: pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL) for name, value in sections.items()}
+    layout = {}
+    offset = 0
+    for name, data in encoded.items():
+        layout[name] = [offset, len(data)]
+        offset += len(data)
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "taken_at": taken_at.isoformat(),
+        "sections": layout
+    }).encode()
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(_LENGTH_BYTES, "little"))
+        f.write(header)
+        for data in encoded.values():
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+    return len(MAGIC) + _LENGTH_BYTES + len(header) + offset
+
+
+def write_snapshot_forked(path: str, sections: Dict[str, Any], taken_at: datetime) -> Optional[int]:
+    """Start write_snapshot in a forked child; returns its pid, or None after writing in-process"""
+    if not hasattr(os, "fork"):
+        write_snapshot(path, sections, taken_at)
+        return None
+    pid = os.fork()
+    if pid:
+        return pid
+    # Child: never return into the parent's event loop
+    status = 1
+    try:
+        write_snapshot(path, sections, taken_at)
+        status = 0
+    finally:
+        os._exit(status)
+
+
+class Snapshot:
+    """A snapshot file mapped read-only; sections are decoded on demand"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if self._map[:len(MAGIC)] != MAGIC:
+                raise SnapshotError("Not a snapshot file")
+            start = len(MAGIC) + _LENGTH_BYTES
+            header_length = int.from_bytes(self._map[len(MAGIC):start], "little")
+            header = json.loads(self._map[start:start + header_length])
+            if header.get("version") != FORMAT_VERSION:
+                raise SnapshotError(f"Unsupported snapshot version {header.get('version')}")
+        except (SnapshotError, ValueError):
+            self._map.close()
+            raise
+        self.taken_at = datetime.fromisoformat(header["taken_at"])
+        self._base = start + header_length
+        self._sections = header["sections"]
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._sections
+
+    def load(self, name: str) -> Any:
+        offset, length = self._sections[name]
+        view = memoryview(self._map)[self._base + offset:self._base + offset + length]
+        try:
+            return pickle.loads(view)
+        finally:
+            view.release()
+
+    def close(self) -> None:
+        self._map.close()
+
+
+class WriterLock:
+    """Advisory lock electing the one process that writes snapshots"""
+
+    def __init__(self, path: str):
+        self.path = f"{path}.lock"
+        self._file = None
+
+    def acquire(self) -> bool:
+        """Take the lock without blocking; it is held until release or process exit"""
+        if self._file is not None:
+            return True
+        if fcntl is None:
+            return True
+        lock_file = open(self.path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,280 @@
+"""Content-addressed file storage with streaming, resumable uploads and range downloads.
+
+Files are streamed to disk in fixed-size chunks while their SHA-256 is
+computed, then moved to objects/<aa>/<bb>/<digest>; identical uploads are
+stored once. Large bundles can instead be sent through an upload session in
+any number of chunks, resuming from the last acknowledged offset after a
+dropped connection. Downloads honour single byte ranges and hand the file
+descriptor to the server when it supports the ASGI zero-copy send extension.
+"""
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import uuid
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+CHUNK_SIZE = 1024 * 1024  # 1 MiB
+STORAGE_ROOT = os.getenv("STORAGE_ROOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "storage"))
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(1024 * 1024 * 1024)))  # 1 GiB
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Leading bytes of the image formats served publicly as thumbnails and previews
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+class StorageError(Exception):
+    """Base class for storage failures"""
+
+
+class UploadNotFound(StorageError):
+    pass
+
+
+class UploadOffsetMismatch(StorageError):
+    """A chunk was sent for an offset other than the session's current size"""
+
+    def __init__(self, expected: int):
+        super().__init__(f"Expected upload offset {expected}")
+        self.expected = expected
+
+
+class UploadTooLarge(StorageError):
+    pass
+
+
+class RangeNotSatisfiable(StorageError):
+    pass
+
+
+class FileStorage:
+    """Content-addressed blobs under a root directory, plus resumable upload sessions"""
+
+    def __init__(self, root: str = STORAGE_ROOT, chunk_size: int = CHUNK_SIZE, max_size: int = MAX_UPLOAD_SIZE):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.max_size = max_size
+        self._objects = os.path.join(root, "objects")
+        self._uploads = os.path.join(root, "uploads")
+        os.makedirs(self._objects, exist_ok=True)
+        os.makedirs(self._uploads, exist_ok=True)
+
+    # Objects
+
+    def object_path(self, digest: str) -> Optional[str]:
+        """Path of a stored object, or None if the digest is unknown or malformed"""
+        if not _DIGEST_RE.match(digest):
+            return None
+        path = os.path.join(self._objects, digest[:2], digest[2:4], digest)
+        return path if os.path.isfile(path) else None
+
+    def image_type(self, digest: str) -> Optional[str]:
+        """Media type of a stored object if its content is an image, else None"""
+        path = self.object_path(digest)
+        if not path:
+            return None
+        with open(path, "rb") as f:
+            head = f.read(12)
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return "image/webp"
+        for signature, media_type in IMAGE_SIGNATURES:
+            if head.startswith(signature):
+                return media_type
+        return None
+
+    def _commit(self, temp_path: str, digest: str) -> str:
+        """Move a fully written temp file into place, dropping it if the content already exists"""
+        directory = os.path.join(self._objects, digest[:2], digest[2:4])
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, digest)
+        if os.path.exists(path):
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, path)
+        return path
+
+    async def _write_stream(self, chunks: AsyncIterator[bytes], path: str, mode: str, limit: int) -> int:
+        """Append an async stream of chunks to a file without buffering it; returns bytes written"""
+        written = 0
+        f = await run_in_threadpool(open, path, mode)
+        try:
+            async for chunk in chunks:
+                written += len(chunk)
+                if written > limit:
+                    raise UploadTooLarge(f"Upload exceeds {self.max_size} bytes")
+                await run_in_threadpool(f.write, chunk)
+        finally:
+            await run_in_threadpool(f.close)
+        return written
+
+    def _hash_file(self, path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    async def save_upload(self, upload) -> Dict[str, object]:
+        """Stream an UploadFile into the store in CHUNK_SIZE pieces, hashing as it goes"""
+        digest = hashlib.sha256()
+
+        async def chunks():
+            while True:
+                chunk = await upload.read(self.chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                yield chunk
+
+        temp_path = os.path.join(self._uploads, f"{uuid.uuid4().hex}.tmp")
+        try:
+            size = await self._write_stream(chunks(), temp_path, "wb", self.max_size)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        await run_in_threadpool(self._commit, temp_path, digest.hexdigest())
+        return {"digest": digest.hexdigest(), "size": size, "filename": upload.filename}
+
+    # Resumable upload sessions
+
+    def _session_paths(self, upload_id: str) -> Tuple[str, str]:
+        if not re.match(r"^[0-9a-f]{32}$", upload_id):
+            raise UploadNotFound(upload_id)
+        base = os.path.join(self._uploads, upload_id)
+        return base + ".json", base + ".part"
+
+    def _load_session(self, upload_id: str) -> Tuple[Dict[str, object], str]:
+        meta_path, part_path = self._session_paths(upload_id)
+        if not os.path.exists(meta_path):
+            raise UploadNotFound(upload_id)
+        with open(meta_path) as f:
+            return json.load(f), part_path
+
+    def create_session(self, filename: str, size: Optional[int] = None, owner_id: Optional[str] = None) -> Dict[str, object]:
+        if size is not None and size > self.max_size:
+            raise UploadTooLarge(f"Upload exceeds {self.max_size} bytes")
+        upload_id = uuid.uuid4().hex
+        meta_path, part_path = self._session_paths(upload_id)
+        meta = {"upload_id": upload_id, "filename": filename, "size": size, "owner_id": owner_id}
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+        open(part_path, "wb").close()
+        return {**meta, "offset": 0, "chunk_size": self.chunk_size}
+
+    def session_status(self, upload_id: str) -> Dict[str, object]:
+        meta, part_path = self._load_session(upload_id)
+        return {**meta, "offset": os.path.getsize(part_path), "chunk_size": self.chunk_size}
+
+    async def append_chunk(self, upload_id: str, offset: int, chunks: AsyncIterator[bytes]) -> int:
+        """Append streamed bytes at offset; returns the new offset"""
+        meta, part_path = await run_in_threadpool(self._load_session, upload_id)
+        current = os.path.getsize(part_path)
+        if offset != current:
+            raise UploadOffsetMismatch(current)
+        limit = (meta["size"] if meta["size"] is not None else self.max_size) - current
+        written = await self._write_stream(chunks, part_path, "ab", limit)
+        return current + written
+
+    async def complete_session(self, upload_id: str) -> Dict[str, object]:
+        """Hash the assembled upload and move it into the object store"""
+        meta, part_path = await run_in_threadpool(self._load_session, upload_id)
+        size = os.path.getsize(part_path)
+        if meta["size"] is not None and size != meta["size"]:
+            raise UploadOffsetMismatch(size)
+        digest = await run_in_threadpool(self._hash_file, part_path)
+        await run_in_threadpool(self._commit, part_path, digest)
+        os.remove(self._session_paths(upload_id)[0])
+        return {"digest": digest, "size": size, "filename": meta["filename"]}
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single-range Range header, or None to send the whole file.
+
+    Multi-range and malformed headers are ignored, as RFC 9110 allows.
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable(f"bytes */{size}")
+    return start, end
+
+
+class FileRangeResponse(Response):
+    """Sends a file or a byte range of it.
+
+    Uses the ``http.response.zerocopysend`` ASGI extension (sendfile) when the
+    server offers it, otherwise reads CHUNK_SIZE pieces with pread in a thread.
+    """
+
+    def __init__(self, path: str, range_header: Optional[str] = None, filename: Optional[str] = None,
+                 media_type: Optional[str] = None, etag: Optional[str] = None,
+                 cache_control: str = "public, max-age=31536000, immutable"):
+        size = os.path.getsize(path)
+        byte_range = parse_range(range_header, size)
+        self.path = path
+        self.start, self.end = byte_range if byte_range else (0, size - 1)
+        self.status_code = 206 if byte_range else 200
+        self.media_type = media_type or (mimetypes.guess_type(filename)[0] if filename else None) \
+            or "application/octet-stream"
+        self.background = None
+        self.body = b""
+
+        headers = {"accept-ranges": "bytes", "content-length": str(self.end - self.start + 1)}
+        if byte_range:
+            headers["content-range"] = f"bytes {self.start}-{self.end}/{size}"
+        if etag:
+            headers["etag"] = f'"{etag}"'
+            headers["cache-control"] = cache_control
+        if filename:
+            headers["content-disposition"] = f'attachment; filename="{filename}"'
+        self.init_headers(headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        count = self.end - self.start + 1
+        if scope["method"] == "HEAD" or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        with open(self.path, "rb") as f:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f.fileno(),
+                    "offset": self.start,
+                    "count": count,
+                    "more_body": False
+                })
+                return
+
+            offset, remaining = self.start, count
+            while remaining > 0:
+                chunk = await run_in_threadpool(os.pread, f.fileno(), min(CHUNK_SIZE, remaining), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -0,0 +1,71 @@
+"""Pagination cursors: round trips and rejection of malformed or crafted cursors"""
+import base64
+import json
+import os
+import tempfile
+
+import pytest
+from fastapi import HTTPException
+
+# The app configures its stores at import time
+os.environ.setdefault("STORAGE_ROOT", tempfile.mkdtemp(prefix="test-storage-"))
+
+from app import decode_cursor, encode_cursor  # noqa: E402
+
+
+def raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def rejected(cursor: str, sort: str) -> HTTPException:
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, sort)
+    assert error.value.status_code == 400
+    return error.value
+
+
+@pytest.mark.parametrize("sort, position", [
+    ("created_at", {"k": [-1760784000.5, "0b4e6f1c-template"]}),
+    ("downloads", {"k": [-120, "0b4e6f1c-template"]}),
+    ("rating", {"k": [-4.5, "0b4e6f1c-template"]}),
+    ("search", {"o": 40}),
+])
+def test_round_trip(sort, position):
+    assert decode_cursor(encode_cursor(sort, position), sort) == {"s": sort, **position}
+
+
+def test_cursor_is_bound_to_its_sort_order():
+    cursor = encode_cursor("downloads", {"k": [-120, "t1"]})
+    assert rejected(cursor, "rating").detail == "Cursor does not match the requested sort order"
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", raw_cursor([1, 2]), raw_cursor("text"), "e30"])
+def test_malformed_cursors_are_rejected(cursor):
+    rejected(cursor, "created_at")
+
+
+@pytest.mark.parametrize("key", [
+    ["a", "t1"],
+    [1, 2],
+    [None, "t1"],
+    [True, "t1"],
+    [[1], "t1"],
+    [1],
+    [1, "t1", "extra"],
+    "1,t1",
+])
+def test_listing_keys_must_be_a_number_and_an_id(key):
+    rejected(raw_cursor({"s": "created_at", "k": key}), "created_at")
+
+
+def test_listing_cursor_needs_a_key():
+    rejected(raw_cursor({"s": "created_at", "o": 20}), "created_at")
+
+
+@pytest.mark.parametrize("offset", [-1, "20", 2.5, True, None])
+def test_search_offsets_must_be_non_negative_integers(offset):
+    rejected(raw_cursor({"s": "search", "o": offset}), "search")
+
+
+def test_search_cursor_needs_an_offset():
+    rejected(raw_cursor({"s": "search", "k": [1, "t1"]}), "search")
@@ -0,0 +1,122 @@
+"""LedgerWriter: per-key deduplication, group commit and per-entry retry"""
+import asyncio
+
+import pytest
+
+from database import IntegrityError
+from ledger import LedgerWriter
+
+
+class FakeLedger:
+    """Records every commit; entries listed in duplicates fail like a unique violation"""
+
+    def __init__(self, duplicates=(), delay=0.0):
+        self.duplicates = set(duplicates)
+        self.delay = delay
+        self.commits = []
+
+    async def commit(self, entries):
+        self.commits.append(list(entries))
+        await asyncio.sleep(self.delay)
+        if self.duplicates & set(entries):
+            raise IntegrityError("INSERT INTO purchases", {}, Exception("duplicate payment_id"))
+        return [f"recorded:{entry}" for entry in entries]
+
+
+def test_same_key_is_written_once():
+    async def run():
+        ledger = FakeLedger(delay=0.01)
+        writer = LedgerWriter(ledger.commit)
+        results = await asyncio.gather(*(writer.append("pay_1", "pay_1") for _ in range(10)))
+        return ledger, writer, results
+
+    ledger, writer, results = asyncio.run(run())
+    assert results == ["recorded:pay_1"] * 10
+    assert ledger.commits == [["pay_1"]]
+    assert not writer.pending("pay_1")
+
+
+def test_key_can_be_written_again_after_its_write_finished():
+    async def run():
+        ledger = FakeLedger()
+        writer = LedgerWriter(ledger.commit)
+        await writer.append("pay_1", "pay_1")
+        await writer.append("pay_1", "pay_1")
+        return ledger
+
+    # Later duplicates are the database's job (unique payment_id), not the writer's
+    assert asyncio.run(run()).commits == [["pay_1"], ["pay_1"]]
+
+
+def test_appends_during_a_commit_share_the_next_batch():
+    async def run():
+        ledger = FakeLedger(delay=0.01)
+        writer = LedgerWriter(ledger.commit)
+        first = asyncio.create_task(writer.append("a", "a"))
+        await asyncio.sleep(0)
+        rest = [asyncio.create_task(writer.append(key, key)) for key in "bcd"]
+        await asyncio.gather(first, *rest)
+        return ledger, writer
+
+    ledger, writer = asyncio.run(run())
+    assert ledger.commits == [["a"], ["b", "c", "d"]]
+    assert writer.stats() == {"queued": 0, "batches": 2, "entries": 4, "largest_batch": 3}
+
+
+def test_batches_are_capped_at_max_batch():
+    async def run():
+        ledger = FakeLedger()
+        writer = LedgerWriter(ledger.commit, max_batch=2)
+        await asyncio.gather(*(writer.append(key, key) for key in "abcde"))
+        return ledger
+
+    assert asyncio.run(run()).commits == [["a", "b"], ["c", "d"], ["e"]]
+
+
+def test_failed_batch_is_retried_entry_by_entry():
+    async def run():
+        ledger = FakeLedger(duplicates={"b"}, delay=0.01)
+        writer = LedgerWriter(ledger.commit)
+        first = asyncio.create_task(writer.append("first", "first"))
+        await asyncio.sleep(0)
+        tasks = {key: asyncio.create_task(writer.append(key, key)) for key in "abc"}
+        await first
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        return ledger, writer, tasks
+
+    ledger, writer, tasks = asyncio.run(run())
+    assert ledger.commits == [["first"], ["a", "b", "c"], ["a"], ["b"], ["c"]]
+    assert tasks["a"].result() == "recorded:a"
+    assert tasks["c"].result() == "recorded:c"
+    with pytest.raises(IntegrityError):
+        tasks["b"].result()
+    assert not any(writer.pending(key) for key in "abc")
+
+
+def test_single_entry_failure_is_not_retried():
+    async def run():
+        ledger = FakeLedger(duplicates={"a"})
+        writer = LedgerWriter(ledger.commit)
+        with pytest.raises(IntegrityError):
+            await writer.append("a", "a")
+        return ledger
+
+    assert asyncio.run(run()).commits == [["a"]]
+
+
+def test_cancelled_caller_neither_cancels_the_write_nor_other_waiters():
+    async def run():
+        ledger = FakeLedger(delay=0.05)
+        writer = LedgerWriter(ledger.commit)
+        impatient = asyncio.create_task(writer.append("pay_1", "pay_1"))
+        patient = asyncio.create_task(writer.append("pay_1", "pay_1"))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        result = await patient
+        return ledger, writer, impatient, result
+
+    ledger, writer, impatient, result = asyncio.run(run())
+    assert impatient.cancelled()
+    assert result == "recorded:pay_1"
+    assert ledger.commits == [["pay_1"]]
+    assert writer.stats()["entries"] == 1
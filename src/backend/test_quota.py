@@ -0,0 +1,89 @@
+"""Sliding-window quota math of the in-process backend"""
+import asyncio
+
+from quota import InMemoryQuotaBackend, QuotaTracker
+
+DAY = 24 * 60 * 60
+
+
+def consume(tracker, key, limit, now):
+    return asyncio.run(tracker.consume(key, limit, now=now))
+
+
+def test_hits_are_allowed_up_to_the_limit():
+    tracker = QuotaTracker(window=DAY)
+    results = [consume(tracker, "u1", 3, now=DAY * 10 + i) for i in range(4)]
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert [r.remaining for r in results] == [2, 1, 0, 0]
+    assert results[0].retry_after == 0
+    assert results[3].limit == 3
+
+
+def test_refused_hits_are_not_counted():
+    tracker = QuotaTracker(window=DAY)
+    for i in range(10):
+        consume(tracker, "u1", 2, now=DAY * 10 + i)
+    # Two counted hits decay to one by the middle of the next window, leaving room for one
+    assert consume(tracker, "u1", 2, now=DAY * 11 + DAY // 2).allowed
+
+
+def test_keys_are_independent():
+    tracker = QuotaTracker(window=DAY)
+    assert consume(tracker, "u1", 1, now=DAY * 10).allowed
+    assert not consume(tracker, "u1", 1, now=DAY * 10 + 1).allowed
+    assert consume(tracker, "u2", 1, now=DAY * 10 + 1).allowed
+
+
+def test_previous_window_is_weighted_by_the_remaining_overlap():
+    tracker = QuotaTracker(window=DAY)
+    for i in range(4):
+        consume(tracker, "u1", 4, now=DAY * 10 + i)
+    # Just after the boundary the previous window still counts in full
+    assert not consume(tracker, "u1", 4, now=DAY * 11 + 1).allowed
+    # Half way through, it counts for half: 4 * 0.5 = 2, so two more hits fit
+    halfway = DAY * 11 + DAY // 2
+    assert [consume(tracker, "u1", 4, now=halfway + i).allowed for i in range(3)] == [True, True, False]
+
+
+def test_usage_older_than_two_windows_is_forgotten():
+    tracker = QuotaTracker(window=DAY)
+    for i in range(3):
+        consume(tracker, "u1", 3, now=DAY * 10 + i)
+    result = consume(tracker, "u1", 3, now=DAY * 12 + 1)
+    assert result.allowed and result.remaining == 2
+
+
+def test_retry_after_overestimates_the_wait_by_at_most_a_second():
+    tracker = QuotaTracker(window=DAY)
+    for i in range(4):
+        consume(tracker, "u1", 4, now=DAY * 10 + i)
+    refused_at = DAY * 11 + 1000
+    refused = consume(tracker, "u1", 4, now=refused_at)
+    assert not refused.allowed and refused.retry_after > 0
+
+    # Probe separate trackers with the same history so the probes don't consume quota
+    def allowed_at(now):
+        probe = QuotaTracker(window=DAY)
+        for i in range(4):
+            consume(probe, "u1", 4, now=DAY * 10 + i)
+        return consume(probe, "u1", 4, now=now).allowed
+
+    assert not allowed_at(refused_at + refused.retry_after - 2)
+    assert allowed_at(refused_at + refused.retry_after)
+
+
+def test_retry_after_waits_for_the_next_window_when_the_current_one_is_full():
+    tracker = QuotaTracker(window=DAY)
+    start = DAY * 10 + 100
+    consume(tracker, "u1", 1, now=start)
+    refused = consume(tracker, "u1", 1, now=start + 50)
+    assert refused.retry_after == DAY - 150 + 1
+
+
+def test_stale_keys_are_swept_as_the_table_grows():
+    backend = InMemoryQuotaBackend(sweep_threshold=2)
+    tracker = QuotaTracker(backend, window=DAY)
+    consume(tracker, "old1", 5, now=DAY * 10)
+    consume(tracker, "old2", 5, now=DAY * 10)
+    consume(tracker, "new1", 5, now=DAY * 13)
+    assert set(backend._buckets) == {"new1"}
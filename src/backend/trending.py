@@ -0,0 +1,114 @@
+"""Time-decayed popularity scoring behind the trending and featured flags.
+
+Every pass takes a snapshot of the catalog columns and folds the counter
+growth since the previous pass (downloads, views, sales, reviews) into an
+exponentially decayed activity score per template:
+
+    activity = activity * 0.5 ** (elapsed / half_life) + weighted deltas
+
+so a template's activity approximates its recent popularity without keeping
+per-event history. The trending score scales activity by a Bayesian-averaged
+rating. The whole pass is a handful of vectorized numpy operations, and the
+top-K selections are returned as complete sets for the caller to swap in.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from records import STATUS_CODES
+
+logger = logging.getLogger(__name__)
+
+# Activity weight of one unit of growth in each counter
+ACTIVITY_WEIGHTS = {
+    "downloads": 1.0,
+    "views": 0.1,
+    "sales": 5.0,
+    "reviews_count": 2.0,
+}
+
+
+def _resize(array: np.ndarray, size: int) -> np.ndarray:
+    """Pad an array from a previous pass with zeros for templates added since"""
+    if len(array) >= size:
+        return array[:size]
+    padded = np.zeros(size, array.dtype)
+    padded[:len(array)] = array
+    return padded
+
+
+def top_rows(values: np.ndarray, eligible: np.ndarray, k: int) -> np.ndarray:
+    """Rows of the k largest eligible values, largest first"""
+    rows = np.flatnonzero(eligible)
+    if k <= 0 or not len(rows):
+        return rows[:0]
+    if len(rows) > k:
+        rows = rows[np.argpartition(-values[rows], k - 1)[:k]]
+    return rows[np.argsort(-values[rows], kind="stable")]
+
+
+class TrendingScorer:
+    """Keeps decayed activity per catalog row between passes"""
+
+    def __init__(self, half_life: float = 3 * 24 * 60 * 60, top_k: int = 50, featured_k: int = 12,
+                 prior_reviews: float = 5.0):
+        self.half_life = half_life
+        self.top_k = top_k
+        self.featured_k = featured_k
+        self.prior_reviews = prior_reviews
+        self.activity = np.zeros(0)
+        self.trending: List[str] = []
+        self.featured: List[str] = []
+        self._counters: Dict[str, np.ndarray] = {}
+        self._last_run: Optional[float] = None
+
+    def _weighted(self, counters: Dict[str, np.ndarray]) -> np.ndarray:
+        return sum(weight * counters[name].astype(np.float64) for name, weight in ACTIVITY_WEIGHTS.items())
+
+    def score(self, ids: List[str], columns: Dict[str, np.ndarray], now: float) -> Tuple[List[str], List[str]]:
+        """Fold a column snapshot into the activity scores; returns (trending ids, featured ids) best first"""
+        size = len(ids)
+        counters = {name: columns[name] for name in ACTIVITY_WEIGHTS}
+        if self._last_run is None:
+            # No earlier pass to diff against: treat lifetime counters as activity spread
+            # over each template's age, so long-standing totals start out mostly decayed
+            age = np.maximum(now - columns["created_at"], 0.0)
+            activity = self._weighted(counters) * 0.5 ** (age / (2 * self.half_life))
+        else:
+            decay = 0.5 ** (max(now - self._last_run, 0.0) / self.half_life)
+            growth = self._weighted(counters) - self._weighted(
+                {name: _resize(self._counters[name], size) for name in ACTIVITY_WEIGHTS}
+            )
+            activity = _resize(self.activity, size) * decay + np.maximum(growth, 0.0)
+        self.activity = activity
+        self._counters = counters
+        self._last_run = now
+
+        approved = columns["status"] == STATUS_CODES["approved"]
+        reviews = columns["reviews_count"].astype(np.float64)
+        rated = approved & (reviews > 0)
+        mean = float(columns["rating"][rated].mean()) if rated.any() else 0.0
+        # Bayesian average pulls ratings with few reviews towards the catalog mean
+        quality = (columns["rating"] * reviews + mean * self.prior_reviews) / (reviews + self.prior_reviews)
+        multiplier = quality / mean if mean else np.ones(size)
+
+        trending_score = activity * multiplier
+        trending_rows = top_rows(trending_score, approved & (trending_score > 0), self.top_k)
+        featured_score = quality * np.log1p(activity)
+        featured_rows = top_rows(featured_score, rated & (featured_score > 0), self.featured_k)
+
+        self.trending = [ids[row] for row in trending_rows]
+        self.featured = [ids[row] for row in featured_rows]
+        return self.trending, self.featured
+
+
+async def run_every(interval: float, job: Callable[[], Awaitable[None]]) -> None:
+    """Run a coroutine job forever at a fixed interval, logging failures"""
+    while True:
+        try:
+            await job()
+        except Exception:
+            logger.exception("Periodic job %s failed", getattr(job, "__name__", job))
+        await asyncio.sleep(interval)